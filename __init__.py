@@ -1,17 +1,25 @@
 """
 Excel SKU智能拼接节点
 支持从Excel读取SKU分组信息，自动下载图片并拼接
+pandas / numpy / torch / PIL / requests 在首次执行节点或调用上传端点时才导入；
+设置 EXCEL_SKU_LOADER_PROFILE_IMPORTS=1 输出导入耗时报告
 """
 
+from .lazy_imports import import_profile
+
+import_profile.begin()
+
 from .nodes import NODE_CLASS_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS
 
 # 导入服务器路由（自动注册上传端点）
 try:
     from . import server
-    print("✅ Excel SKU Loader 服务器模块已加载")
+    print("✅ Excel SKU Loader 已加载 (上传端点: POST /excel_sku_loader/upload)")
 except Exception as e:
     print(f"⚠️ Excel SKU Loader 服务器模块加载失败: {e}")
 
+import_profile.end()
+
 __all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS']
 __version__ = "1.1.0"
-__author__ = "SKU Collage Team"
\ No newline at end of file
+__author__ = "SKU Collage Team"
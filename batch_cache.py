@@ -0,0 +1,109 @@
+"""
+组合SKU批次结果缓存（增量重新执行）
+每个分组按决定批次像素的内容（图片 URL 序列 + 影响像素的设置）计算指纹，
+已完成的批次张量按指纹缓存；工作簿修改后只有新增或变化的分组需要重新构建。
+SKU 名称和 PCS 只影响标签，标签每次重新生成，因此不参与指纹。
+同一 URL 的图片内容可能变化，因此每个批次同时记录构建时所用图片内容的校验值，
+复用前按当前图片内容（经磁盘缓存重新验证）重新计算，不一致时重新构建
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def group_fingerprint(urls, *settings):
+    """分组指纹：图片 URL 序列（顺序敏感）+ 影响输出像素的设置"""
+    payload = json.dumps([list(urls), list(settings)], ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def image_digest(content):
+    """单张图片原始字节的摘要"""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def content_validator(digests):
+    """分组内图片摘要序列的校验值（顺序敏感），任一图片摘要缺失时为 None"""
+    digests = list(digests)
+    if any(digest is None for digest in digests):
+        return None
+    return hashlib.blake2b(''.join(digests).encode('ascii'), digest_size=16).hexdigest()
+
+
+class BatchResultCache:
+    """
+    按字节预算的 LRU 批次缓存（值为 [N,H,W,3] float32 张量及构建时的图片校验值）
+    复用时返回同一个张量对象，不额外占用内存
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _nbytes(tensor):
+        return tensor.element_size() * tensor.nelement()
+
+    def __contains__(self, fingerprint):
+        with self._lock:
+            return fingerprint in self._entries
+
+    def get(self, fingerprint, validator):
+        """校验值与构建时一致才返回批次；不一致的条目已过期，直接删除"""
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None or validator is None or entry[0] != validator:
+                if entry is not None:
+                    del self._entries[fingerprint]
+                    self.current_bytes -= self._nbytes(entry[1])
+                self.misses += 1
+                return None
+            self._entries.move_to_end(fingerprint)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, fingerprint, tensor, validator):
+        nbytes = self._nbytes(tensor)
+        with self._lock:
+            old = self._entries.pop(fingerprint, None)
+            if old is not None:
+                self.current_bytes -= self._nbytes(old[1])
+            if validator is None or nbytes > self.max_bytes:
+                return
+            self._entries[fingerprint] = (validator, tensor)
+            self.current_bytes += nbytes
+            self._evict_locked()
+
+    def resize(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict_locked()
+
+    def _evict_locked(self):
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.current_bytes -= self._nbytes(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
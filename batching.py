@@ -0,0 +1,165 @@
+"""
+批次张量组装
+每个批次只分配一次 [N,H,W,3] 张量（float32 或 float16），图片缩放后直接从 uint8 写入对应槽位；
+可选分配在磁盘上的内存映射文件中（超出内存预算时溢出）
+"""
+
+import os
+import time
+
+from .lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+torch = lazy_module('torch')
+Image = lazy_module('PIL.Image')
+
+
+def fit_within(width, height, target_width, target_height):
+    """
+    等比缩放到目标尺寸内并居中
+    返回 (新宽, 新高, x偏移, y偏移)
+    """
+    scale_ratio = min(target_width / width, target_height / height)
+    new_width = int(width * scale_ratio)
+    new_height = int(height * scale_ratio)
+    x = (target_width - new_width) // 2
+    y = (target_height - new_height) // 2
+    return new_width, new_height, x, y
+
+
+def to_rgb_array(img):
+    """PIL 图片或数组统一为 HxWx3 uint8 数组（灰度扩展为三通道，RGBA 丢弃 alpha）"""
+    array = np.asarray(img)
+    if array.ndim == 2:
+        array = np.repeat(array[:, :, None], 3, axis=2)
+    elif array.shape[-1] == 4:
+        array = array[:, :, :3]
+    return array
+
+
+def batch_nbytes(count, height, width, dtype=None):
+    """[count,height,width,3] 批次张量的字节数（dtype 默认 torch.float32）"""
+    dtype = torch.float32 if dtype is None else dtype
+    return count * height * width * 3 * torch.empty((), dtype=dtype).element_size()
+
+
+class BatchAssembler:
+    """
+    预分配的批次组装器
+    - 输出张量只分配一次，每张图片缩放（如需要）后原地写入其槽位
+    - uint8 → float32 的转换和 /255 归一化在写入时一步完成，不产生中间 float 数组
+    - 填充区域为白色 (1.0)
+    峰值内存 ≈ 一个批次 + 一张缩放后的 uint8 图片
+    reducing_gap 不为 None 时缩小采用先整数倍 reduce 再重采样的快速路径
+    resize_seconds 记录每个槽位的缩放耗时（每个槽位只由一个线程写入，无需加锁）
+    spill_path 不为空时张量分配在该路径的内存映射文件中：页面由内核按需换出，
+    不计入匿名内存；POSIX 上映射后立即删除文件，张量释放时空间自动回收
+    """
+
+    def __init__(self, count, height, width, reducing_gap=None, dtype=None,
+                 spill_path=None):
+        dtype = torch.float32 if dtype is None else dtype
+        self.count = count
+        self.height = height
+        self.width = width
+        self.reducing_gap = reducing_gap
+        self.spilled = spill_path is not None
+        shape = (count, height, width, 3)
+        if spill_path is not None:
+            np_dtype = torch.empty((), dtype=dtype).numpy().dtype
+            mapped = np.memmap(spill_path, dtype=np_dtype, mode='w+', shape=shape)
+            try:
+                os.remove(spill_path)
+            except OSError:
+                # Windows 不能删除已映射的文件，留待下次清理
+                pass
+            self.tensor = torch.from_numpy(mapped)
+        else:
+            self.tensor = torch.empty(shape, dtype=dtype)
+        self._array = self.tensor.numpy()
+        self.resize_seconds = [0.0] * count
+
+    @property
+    def nbytes(self):
+        return self._array.nbytes
+
+    def add(self, index, img):
+        """缩放并居中写入第 index 张图片（img 为 uint8 数组或 PIL 图片）"""
+        slot = self._array[index]
+        array = to_rgb_array(img)
+        height, width = array.shape[:2]
+
+        if (width, height) == (self.width, self.height):
+            np.divide(array, np.float32(255), out=slot)
+            return
+
+        new_width, new_height, x, y = fit_within(width, height, self.width, self.height)
+        if (new_width, new_height) != (width, height):
+            start = time.perf_counter()
+            pil = img if isinstance(img, Image.Image) else Image.fromarray(array)
+            resized = pil.resize((new_width, new_height), Image.Resampling.LANCZOS,
+                                 reducing_gap=self.reducing_gap)
+            array = to_rgb_array(resized)
+            self.resize_seconds[index] = time.perf_counter() - start
+
+        slot.fill(1.0)
+        np.divide(array, np.float32(255), out=slot[y:y + new_height, x:x + new_width])
+
+
+def plan_size_buckets(sizes, bucket_count, iterations=20):
+    """
+    按宽高比和尺寸把图片分桶，减少统一画布带来的填充浪费
+    在 (对数宽高比, 对数边长) 上做一维初始化的 k-means；
+    返回每个桶的图片下标列表，桶按宽高比升序，桶内保持原始顺序
+    """
+    if not sizes:
+        return []
+    dims = np.asarray(sizes, dtype=np.float64)
+    features = np.column_stack([
+        np.log(dims[:, 0] / dims[:, 1]),
+        0.5 * np.log(dims[:, 0] * dims[:, 1]),
+    ])
+    k = max(1, min(int(bucket_count), len(sizes)))
+
+    # 初始化：按宽高比排序后等分，每段取均值
+    order = np.argsort(features[:, 0], kind='stable')
+    centers = np.array([features[chunk].mean(axis=0) for chunk in np.array_split(order, k)])
+
+    labels = np.zeros(len(sizes), dtype=np.int64)
+    for _ in range(iterations):
+        distances = ((features[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        new_labels = distances.argmin(axis=1)
+        if np.array_equal(new_labels, labels) and _ > 0:
+            break
+        labels = new_labels
+        for c in range(k):
+            members = features[labels == c]
+            if len(members):
+                centers[c] = members.mean(axis=0)
+
+    buckets = []
+    for c in np.argsort(centers[:, 0], kind='stable'):
+        members = np.flatnonzero(labels == c)
+        if len(members):
+            buckets.append(members.tolist())
+    return buckets
+
+
+def canvas_for(sizes, max_side=0):
+    """桶的统一画布：成员的最大宽、最大高（可被 max_side 限制）"""
+    width = max(w for w, _ in sizes)
+    height = max(h for _, h in sizes)
+    if max_side:
+        width, height = min(width, max_side), min(height, max_side)
+    return width, height
+
+
+def padding_ratio(sizes, width, height):
+    """图片放入 width x height 画布后，填充像素占画布总像素的比例"""
+    if not sizes:
+        return 0.0
+    used = 0
+    for w, h in sizes:
+        new_width, new_height, _, _ = fit_within(w, h, width, height)
+        used += new_width * new_height
+    return 1.0 - used / (len(sizes) * width * height)
@@ -0,0 +1,4 @@
+"""
+ExcelSKULoader 性能基准
+在仓库根目录运行: python -m benchmarks.run --help
+"""
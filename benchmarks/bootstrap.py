@@ -0,0 +1,56 @@
+"""
+离线加载节点包
+用桩模块替代 ComfyUI 的 folder_paths / server，把仓库根目录作为包导入，
+不需要安装 ComfyUI
+"""
+
+import importlib.util
+import os
+import sys
+import types
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = 'excel_sku_collage'
+
+
+def install_stubs(base_dir):
+    """安装 folder_paths（目录指向 base_dir）和 server（PromptServer 路由表）桩模块"""
+    for name in ('input', 'temp', 'output'):
+        os.makedirs(os.path.join(base_dir, name), exist_ok=True)
+
+    folder_paths = types.ModuleType('folder_paths')
+    folder_paths.base_path = base_dir
+    folder_paths.get_input_directory = lambda: os.path.join(base_dir, 'input')
+    folder_paths.get_temp_directory = lambda: os.path.join(base_dir, 'temp')
+    folder_paths.get_output_directory = lambda: os.path.join(base_dir, 'output')
+    sys.modules['folder_paths'] = folder_paths
+
+    try:
+        from aiohttp import web
+    except ImportError:
+        # 没有 aiohttp 时上传路由加载失败，节点本身不受影响
+        return
+
+    class _PromptServer:
+        def __init__(self):
+            self.routes = web.RouteTableDef()
+
+    server = types.ModuleType('server')
+    server.PromptServer = _PromptServer
+    _PromptServer.instance = _PromptServer()
+    sys.modules['server'] = server
+
+
+def load_package(base_dir):
+    """安装桩模块后导入节点包，返回包模块"""
+    if PACKAGE_NAME in sys.modules:
+        return sys.modules[PACKAGE_NAME]
+    install_stubs(base_dir)
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE_NAME, os.path.join(REPO_ROOT, '__init__.py'),
+        submodule_search_locations=[REPO_ROOT],
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE_NAME] = package
+    spec.loader.exec_module(package)
+    return package
@@ -0,0 +1,99 @@
+"""
+主机熔断行为检查
+用本地图片服务器检查 ImageDownloader 与 HostCircuitBreaker 的配合：
+- 偶发 503（重试可恢复）的主机不会被熔断
+- 熔断后冷却结束，探测请求成功即恢复，后续请求正常发出
+不符合预期时退出码为 1，可在 CI 中运行
+
+用法（仓库根目录）:
+    python -m benchmarks.breaker_check
+    python -m benchmarks.breaker_check --images 500 --failure-rate 0.05
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+
+from .bootstrap import load_package
+from .image_server import ImageServer
+
+parser = argparse.ArgumentParser(description="主机熔断行为检查")
+parser.add_argument('--images', type=int, default=300, help="偶发失败检查的图片数")
+parser.add_argument('--failure-rate', type=float, default=0.03, help="偶发失败检查中返回 503 的概率")
+parser.add_argument('--threshold', type=int, default=5, help="熔断阈值（连续失败次数）")
+
+
+def make_downloader(package, threshold, cooldown):
+    breaker = package.failure_cache.HostCircuitBreaker(threshold=threshold, cooldown=cooldown)
+    downloader = package.downloader.ImageDownloader(max_workers=8, per_host_limit=4, retries=2,
+                                                    backoff=0.01, breaker=breaker)
+    return downloader, breaker
+
+
+def check_flaky_host(package, args):
+    """偶发 503 的主机：重试后成功的请求清零连续失败次数，主机不应熔断"""
+    server = ImageServer(failure_rate=args.failure_rate, seed=1).start()
+    downloader, breaker = make_downloader(package, args.threshold, cooldown=60)
+    try:
+        urls = [f"{server.base_url}/img/{i}_64x48.jpg" for i in range(args.images)]
+        results = downloader.fetch_all(urls)
+    finally:
+        downloader.close()
+        server.stop()
+    skipped = sum(1 for result in results.values() if result.error_class == 'circuit_open')
+    failed = sum(1 for result in results.values() if not result.ok)
+    print(f"   偶发失败: {args.images} 张, 失败 {failed}, 熔断跳过 {skipped}, "
+          f"熔断次数 {breaker.trips}, 服务器请求 {server.stats()['requests']}")
+    if skipped or breaker.trips:
+        return [f"失败率 {args.failure_rate:.0%} 的主机被熔断 ({skipped} 张跳过)"]
+    return []
+
+
+def check_probe_recovery(package, args):
+    """主机熔断后恢复：冷却结束的探测请求成功后，后续请求不再跳过"""
+    server = ImageServer(failure_rate=1.0).start()
+    cooldown = 0.2
+    downloader, breaker = make_downloader(package, args.threshold, cooldown)
+    downloader.retries = 0
+    failures = []
+    try:
+        url = lambda i: f"{server.base_url}/img/{i}_64x48.jpg"
+        for i in range(args.threshold):
+            downloader.fetch(url(i))
+        if not breaker.open_hosts():
+            failures.append(f"连续 {args.threshold} 次 503 后主机未熔断")
+        if downloader.fetch(url(100)).error_class != 'circuit_open':
+            failures.append("熔断期间请求未被跳过")
+
+        server.failure_rate = 0.0
+        time.sleep(cooldown * 1.5)
+        probe = downloader.fetch(url(101))
+        after = [downloader.fetch(url(102 + i)) for i in range(3)]
+    finally:
+        downloader.close()
+        server.stop()
+    print(f"   探测恢复: 探测 {'成功' if probe.ok else probe.error}, "
+          f"之后 {sum(result.ok for result in after)}/{len(after)} 张成功, "
+          f"熔断主机 {len(breaker.open_hosts())}")
+    if not probe.ok:
+        failures.append(f"冷却结束后的探测请求失败: {probe.error}")
+    if not all(result.ok for result in after) or breaker.open_hosts():
+        failures.append("探测成功后主机仍处于熔断状态")
+    return failures
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    package = load_package(tempfile.mkdtemp(prefix='excel_sku_breaker_'))
+    print("🔌 主机熔断检查")
+    failures = check_flaky_host(package, args) + check_probe_recovery(package, args)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ 主机熔断检查通过")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+本地图片服务器
+图片按路径中的编号和尺寸（/img/<编号>_<宽>x<高>.jpg）确定性生成，
+可配置响应延迟、失败率和单连接带宽，支持 ETag 条件请求
+"""
+
+import io
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from PIL import Image
+
+_IMAGE_PATH = re.compile(r'^/img/(\d+)_(\d+)x(\d+)\.jpg$')
+_CHUNK = 16 * 1024
+
+
+def render_image(image_id, width, height):
+    """生成带渐变和噪声的 JPEG（压缩率接近商品照片，而不是纯色图）"""
+    rng = np.random.default_rng(image_id)
+    base = rng.integers(0, 256, size=3)
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :, None]
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None, None]
+    pixels = base * (0.6 + 0.4 * x) * (0.7 + 0.3 * y)
+    pixels = pixels + rng.normal(0, 12, size=(height, width, 3))
+    buf = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buf, 'JPEG', quality=85)
+    return buf.getvalue()
+
+
+class ImageServer:
+    """
+    后台线程运行的 HTTP 图片服务器
+    latency_ms/jitter_ms: 每个请求的首字节延迟；failure_rate: 返回 503 的概率；
+    bandwidth_kbs: 单连接带宽（KB/s，0 为不限）
+    """
+
+    def __init__(self, latency_ms=0, jitter_ms=0, failure_rate=0.0, bandwidth_kbs=0,
+                 seed=0, host='127.0.0.1', port=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.bandwidth_kbs = bandwidth_kbs
+        self.requests = 0
+        self.failures = 0
+        self.bytes_sent = 0
+        self._images = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def image(self, image_id, width, height):
+        with self._lock:
+            content = self._images.get(image_id)
+        if content is None:
+            content = render_image(image_id, width, height)
+            with self._lock:
+                self._images[image_id] = content
+        return content
+
+    def _should_fail(self):
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+            return failed
+
+    def _delay(self):
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                match = _IMAGE_PATH.match(self.path)
+                if not match:
+                    self.send_error(404)
+                    return
+                time.sleep(server._delay())
+                if server._should_fail():
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                image_id, width, height = (int(g) for g in match.groups())
+                etag = f'"{image_id}-{width}x{height}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                content = server.image(image_id, width, height)
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.send_header('Content-Length', str(len(content)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self._write_throttled(content)
+                with server._lock:
+                    server.bytes_sent += len(content)
+
+            def _write_throttled(self, content):
+                if not server.bandwidth_kbs:
+                    self.wfile.write(content)
+                    return
+                chunk_seconds = _CHUNK / (server.bandwidth_kbs * 1024)
+                for start in range(0, len(content), _CHUNK):
+                    self.wfile.write(content[start:start + _CHUNK])
+                    time.sleep(chunk_seconds)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'failures': self.failures,
+                    'bytes_sent': self.bytes_sent}
@@ -0,0 +1,92 @@
+"""
+导入耗时预算检查
+在新进程中导入节点包（桩模块替代 ComfyUI），检查：
+- 包导入耗时不超过 --max-seconds
+- 包导入新加载的模块数不超过 --max-modules
+- 导入后没有加载 DEFERRED_MODULES（这些模块在首次执行节点或调用上传端点时才导入）
+随后逐个触发延迟模块，报告首次执行时额外付出的导入耗时
+超出预算时退出码为 1，可在 CI 中运行
+
+用法（仓库根目录）:
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --max-seconds 0.5 --max-modules 150 --repeat 5
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+
+from .bootstrap import REPO_ROOT
+
+# 包导入时不应加载的重依赖
+DEFERRED_MODULES = ('pandas', 'numpy', 'torch', 'PIL', 'requests', 'pyarrow')
+
+
+def run_worker():
+    """子进程：导入包并输出导入记录（JSON）"""
+    from .bootstrap import load_package
+
+    package = load_package(tempfile.mkdtemp(prefix='excel_sku_import_'))
+    profile = package.lazy_imports.import_profile
+    summary = profile.summary()
+    summary['loaded_deferred'] = [name for name in DEFERRED_MODULES if name in sys.modules]
+
+    # 访问 nodes 中的代理模块，触发与首次执行节点时相同的延迟导入
+    for name in ('np', 'pd', 'torch', 'Image', 'requests'):
+        getattr(package.nodes, name).__file__
+    summary['deferred'] = list(profile.deferred)
+    print(json.dumps(summary, ensure_ascii=False))
+
+
+def measure():
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.import_budget', '--worker'],
+                            cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+parser = argparse.ArgumentParser(description="节点包导入耗时预算检查")
+parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+parser.add_argument('--max-seconds', type=float, default=0.5, help="包导入耗时上限（取多次中的最小值）")
+parser.add_argument('--max-modules', type=int, default=150, help="包导入新加载的模块数上限")
+parser.add_argument('--repeat', type=int, default=3, help="测量次数（每次新进程）")
+parser.add_argument('--json', action='store_true', help="输出 JSON 结果")
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    if args.worker:
+        run_worker()
+        return 0
+
+    runs = [measure() for _ in range(max(args.repeat, 1))]
+    best = min(runs, key=lambda run: run['package_seconds'])
+    failures = []
+    if best['package_seconds'] > args.max_seconds:
+        failures.append(f"导入耗时 {best['package_seconds'] * 1000:.0f} ms 超出预算 "
+                        f"{args.max_seconds * 1000:.0f} ms")
+    if best['package_modules'] > args.max_modules:
+        failures.append(f"新加载 {best['package_modules']} 个模块，超出预算 {args.max_modules}")
+    loaded = sorted({name for run in runs for name in run['loaded_deferred']})
+    if loaded:
+        failures.append(f"导入时加载了应延迟的模块: {', '.join(loaded)}")
+
+    if args.json:
+        print(json.dumps({'runs': runs, 'failures': failures}, ensure_ascii=False, indent=2))
+    else:
+        print(f"⏱️ 包导入: {best['package_seconds'] * 1000:.1f} ms (最小值, {len(runs)} 次), "
+              f"新加载 {best['package_modules']} 个模块")
+        print(f"   非标准库模块: {', '.join(best['third_party_modules']) or '无'}")
+        print("   首次执行时的延迟导入:")
+        for entry in best['deferred']:
+            print(f"     {entry['module']:<10}{entry['seconds'] * 1000:>8.0f} ms{entry['modules']:>6} 个模块")
+        for failure in failures:
+            print(f"❌ {failure}")
+        if not failures:
+            print("✅ 导入预算检查通过")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+ExcelSKULoader 基准测试
+每种输出模式测三种缓存状态：
+- cold: 新进程 + 空磁盘缓存
+- disk: 新进程 + 已预热的磁盘缓存（相当于 ComfyUI 重启后）
+- warm: 同一进程内第二次运行（内存缓存 + 已解析工作簿）
+每个场景在独立子进程中运行，互不影响峰值内存；结果写入 benchmarks/results/
+
+用法（仓库根目录）:
+    python -m benchmarks.run
+    python -m benchmarks.run --rows 5000 --groups 500 --latency-ms 50 --failure-rate 0.02
+    python -m benchmarks.run --node-arg max_side=512 --node-arg pipeline_depth=4
+    python -m benchmarks.run --compare latest
+"""
+
+import argparse
+import contextlib
+import gc
+import glob
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from .bootstrap import REPO_ROOT, load_package
+from .image_server import ImageServer
+from .workbook_gen import generate_workbook
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+MODES = ('by_combined_sku', 'all_in_one')
+STAGES = ('excel_read', 'parse', 'download', 'decode', 'resize', 'assembly')
+
+
+class PeakRSS:
+    """后台采样当前进程 RSS，记录区间内峰值（Linux 读 /proc，其他平台退回 ru_maxrss）"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    def _current(self):
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * self._page_size
+        except OSError:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._current())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self._current()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._current())
+
+
+def parse_node_args(pairs):
+    """--node-arg key=value 转为节点参数（值按 JSON 解析，失败时作为字符串）"""
+    kwargs = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition('=')
+        try:
+            kwargs[key] = json.loads(value)
+        except ValueError:
+            kwargs[key] = value
+    return kwargs
+
+
+def run_worker(config_path):
+    """子进程：按配置运行若干次 load_sku_data，结果写回配置中的 result_path"""
+    with open(config_path, encoding='utf-8') as f:
+        config = json.load(f)
+
+    with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+        package = load_package(config['base_dir'])
+    loader = package.NODE_CLASS_MAPPINGS['ExcelSKULoader']()
+
+    results = []
+    for label in config['labels']:
+        kwargs = dict(config['node_kwargs'])
+        with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')), PeakRSS() as rss:
+            start = time.perf_counter()
+            output = loader.load_sku_data(**kwargs)
+            seconds = time.perf_counter() - start
+
+        metrics = json.loads(output[5])
+        # 释放本次输出的批次张量，避免与下一次运行叠加峰值内存
+        del output
+        gc.collect()
+        images = metrics.get('images', 0)
+        results.append({
+            'scenario': f"{kwargs['output_mode']}/{label}",
+            'mode': kwargs['output_mode'],
+            'cache': label,
+            'seconds': round(seconds, 4),
+            'images': images,
+            'batches': metrics.get('batches', 0),
+            'images_per_s': round(images / seconds, 2) if seconds else 0.0,
+            'peak_rss_mb': round(rss.peak / 1024 / 1024, 1),
+            'stages': {name: stage['seconds'] for name, stage in metrics.get('stages', {}).items()},
+            'metrics': metrics,
+        })
+
+    with open(config['result_path'], 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False)
+
+
+def spawn_worker(work_dir, base_dir, labels, node_kwargs):
+    """在新的 Python 进程中运行一组场景"""
+    config_path = os.path.join(work_dir, f"worker-{len(os.listdir(work_dir))}.json")
+    result_path = config_path + '.result'
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'base_dir': base_dir, 'labels': labels, 'node_kwargs': node_kwargs,
+                   'result_path': result_path}, f)
+    subprocess.run([sys.executable, '-m', 'benchmarks.run', '--worker', config_path],
+                   cwd=REPO_ROOT, check=True)
+    with open(result_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_table(results, baseline=None):
+    """打印结果表；给出 baseline 时附加吞吐量变化"""
+    baseline = {r['scenario']: r for r in (baseline or [])}
+    header = f"{'场景':<26}{'图片':>7}{'秒':>9}{'图/秒':>9}{'峰值MB':>9}"
+    header += ''.join(f"{name:>11}" for name in STAGES)
+    if baseline:
+        header += f"{'吞吐变化':>10}"
+    print(header)
+    for r in results:
+        line = (f"{r['scenario']:<26}{r['images']:>7}{r['seconds']:>9.2f}"
+                f"{r['images_per_s']:>9.1f}{r['peak_rss_mb']:>9.0f}")
+        line += ''.join(f"{r['stages'].get(name, 0.0):>11.3f}" for name in STAGES)
+        previous = baseline.get(r['scenario'])
+        if previous and previous['images_per_s']:
+            change = r['images_per_s'] / previous['images_per_s'] - 1
+            line += f"{change * 100:>+9.1f}%"
+        print(line)
+
+
+def load_baseline(compare):
+    if not compare:
+        return None
+    if compare == 'latest':
+        files = sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json')))
+        if not files:
+            print("⚠️ 没有可对比的历史结果")
+            return None
+        compare = files[-1]
+    with open(compare, encoding='utf-8') as f:
+        data = json.load(f)
+    print(f"📎 对比基准: {compare} ({data.get('revision')})")
+    return data['results']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ExcelSKULoader 基准测试")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--rows', type=int, default=500, help="工作簿数据行数")
+    parser.add_argument('--groups', type=int, default=50, help="组合SKU数量")
+    parser.add_argument('--duplicate-ratio', type=float, default=0.3, help="复用已有图片 URL 的行比例")
+    parser.add_argument('--min-side', type=int, default=200, help="图片最小边长")
+    parser.add_argument('--max-side', type=int, default=600, help="图片最大边长")
+    parser.add_argument('--latency-ms', type=float, default=20, help="服务器响应延迟")
+    parser.add_argument('--jitter-ms', type=float, default=5, help="延迟抖动")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="返回 503 的概率")
+    parser.add_argument('--bandwidth-kbs', type=float, default=0, help="单连接带宽 KB/s（0 不限）")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--node-arg', action='append', metavar='KEY=VALUE',
+                        help="额外的节点参数，可重复")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare', help="对比的历史结果文件，latest 为最近一次")
+    parser.add_argument('--no-save', action='store_true', help="不保存结果")
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.worker)
+        return
+
+    baseline = load_baseline(args.compare)
+    work_dir = tempfile.mkdtemp(prefix='excel_sku_bench_')
+    server = ImageServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                         failure_rate=args.failure_rate, bandwidth_kbs=args.bandwidth_kbs,
+                         seed=args.seed).start()
+    try:
+        workbook_path = os.path.join(work_dir, 'bench.xlsx')
+        workbook = generate_workbook(workbook_path, server.base_url, rows=args.rows,
+                                     groups=args.groups, duplicate_ratio=args.duplicate_ratio,
+                                     min_side=args.min_side, max_side=args.max_side,
+                                     seed=args.seed)
+        print(f"📊 合成工作簿: {workbook['rows']} 行, {workbook['groups']} 个组合SKU, "
+              f"{workbook['unique_urls']} 个不同图片")
+        print(f"🌐 图片服务器: {server.base_url} (延迟 {args.latency_ms}ms, "
+              f"失败率 {args.failure_rate}, 带宽 {args.bandwidth_kbs or '不限'} KB/s)")
+
+        results = []
+        for mode in args.modes:
+            node_kwargs = dict(excel_file=workbook_path, sheet_name='Sheet1',
+                               combined_sku_col='A', sku_col='B', pcs_col='C', url_col='D',
+                               start_row=2, output_mode=mode)
+            node_kwargs.update(parse_node_args(args.node_arg))
+            base_dir = os.path.join(work_dir, mode)
+            config_dir = os.path.join(work_dir, 'configs')
+            os.makedirs(config_dir, exist_ok=True)
+
+            print(f"⏱️ {mode}: cold ...")
+            results += spawn_worker(config_dir, base_dir, ['cold'], node_kwargs)
+            print(f"⏱️ {mode}: disk / warm ...")
+            results += spawn_worker(config_dir, base_dir, ['disk', 'warm'], node_kwargs)
+
+        print()
+        print_table(results, baseline)
+        print(f"\n🌐 服务器: {server.stats()}")
+
+        if not args.no_save:
+            os.makedirs(RESULTS_DIR, exist_ok=True)
+            revision = git_revision()
+            path = os.path.join(RESULTS_DIR,
+                                f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{revision}.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'created': datetime.now().isoformat(timespec='seconds'),
+                           'revision': revision, 'params': vars(args), 'workbook': workbook,
+                           'server': server.stats(), 'results': results},
+                          f, ensure_ascii=False, indent=2)
+            print(f"💾 结果已保存: {path}")
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+合成工作簿生成
+按行数、组合SKU数、重复 URL 比例和图片尺寸范围生成 .xlsx，
+组合SKU只写在每组第一行（其余行留空，覆盖空值继承逻辑）
+"""
+
+import random
+
+from openpyxl import Workbook
+
+
+def generate_workbook(path, base_url, rows=2000, groups=200, duplicate_ratio=0.3,
+                      min_side=400, max_side=1200, seed=0, sheet_name='Sheet1'):
+    """
+    写入合成工作簿，返回统计信息
+    duplicate_ratio: 复用已出现过的图片 URL 的行所占比例
+    """
+    rng = random.Random(seed)
+    groups = max(1, min(groups, rows))
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    ws.append(['组合SKU', 'SKU', 'PCS', '图片URL'])
+
+    urls = []
+    for row in range(rows):
+        group = row * groups // rows
+        first_in_group = row == 0 or (row - 1) * groups // rows != group
+        if urls and rng.random() < duplicate_ratio:
+            url = rng.choice(urls)
+        else:
+            width = rng.randint(min_side, max_side)
+            height = rng.randint(min_side, max_side)
+            url = f"{base_url}/img/{len(urls)}_{width}x{height}.jpg"
+            urls.append(url)
+        ws.append([
+            f"COMBO-{group:05d}" if first_in_group else None,
+            f"SKU-{row:06d}",
+            rng.randint(1, 6),
+            url,
+        ])
+
+    wb.save(path)
+    return {'rows': rows, 'groups': groups, 'unique_urls': len(urls)}
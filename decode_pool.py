@@ -0,0 +1,152 @@
+"""
+多核解码/缩放
+- thread 后端：Pillow 解码与重采样期间释放 GIL，线程池即可利用多核，像素数据零拷贝
+- process 后端（需显式选择）：子进程解码，像素通过 multiprocessing.shared_memory 传回，不经过 pickle
+  依赖 fork 启动方式（不支持 fork 的平台自动退回 thread 后端）。ComfyUI 以自定义节点目录路径
+  注册模块、主模块导入时即初始化模型环境，spawn / forkserver 子进程无法按名称导入解码函数，
+  因此只能 fork；而从已有线程、锁和 CUDA 上下文的进程 fork 出的子进程可能死锁。
+  每张图片的解码结果等待 PROCESS_RESULT_TIMEOUT 秒，超时或子进程异常退出时终止子进程，
+  改用线程池解码
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+
+from .imaging import decode_image
+from .lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+
+BACKENDS = ["thread", "process"]
+
+# 多进程解码时等待单张图片结果的秒数，超时视为子进程卡死
+PROCESS_RESULT_TIMEOUT = 60
+
+
+def _decode_to_shared_memory(content, max_side):
+    """子进程：解码后写入共享内存，只返回共享内存名称和形状"""
+    array = decode_image(content, max_side)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    # 共享内存的生命周期交给主进程（取出后 unlink），子进程不再登记
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    try:
+        np.ndarray(array.shape, dtype=np.uint8, buffer=shm.buf)[...] = array
+        return shm.name, array.shape
+    finally:
+        shm.close()
+
+
+def _take_shared_array(name, shape):
+    """主进程：从共享内存取出像素并释放共享内存"""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return np.ndarray(shape, dtype=np.uint8, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+class DecodePool:
+    """解码/缩放工作池，workers <= 1 时在调用线程中串行执行"""
+
+    def __init__(self, workers=4, backend="thread"):
+        self.workers = max(1, int(workers))
+        if backend == "process" and "fork" not in multiprocessing.get_all_start_methods():
+            print("⚠️ 当前平台不支持 fork，多进程解码退回线程池")
+            backend = "thread"
+        self.backend = backend
+        self._threads = None
+        self._processes = None
+        # 多个流水线线程共享同一个池，切换到线程后端时加锁
+        self._switch_lock = threading.Lock()
+        if self.workers > 1:
+            self._threads = ThreadPoolExecutor(max_workers=self.workers,
+                                               thread_name_prefix='excel_sku_decode')
+            if backend == "process":
+                print("⚠️ 多进程解码使用 fork 启动子进程，子进程卡死时会在超时后改用线程池")
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("fork"),
+                )
+
+    def config_key(self):
+        return (self.workers, self.backend)
+
+    def map(self, fn, *iterables):
+        """在线程池中按顺序执行（用于缩放写入批次槽位等 GIL 释放型任务）"""
+        if self._threads is None:
+            return list(map(fn, *iterables))
+        return list(self._threads.map(fn, *iterables))
+
+    def decode_all(self, contents, max_side=0):
+        """
+        并行解码 {key: bytes}
+        返回 {key: uint8 数组或 Exception}
+        """
+        keys = list(contents)
+        results = {}
+
+        processes = self._processes
+        if processes is not None:
+            futures = []
+            try:
+                futures = [processes.submit(_decode_to_shared_memory, contents[key], max_side)
+                           for key in keys]
+                for key, future in zip(keys, futures):
+                    try:
+                        results[key] = _take_shared_array(*future.result(timeout=PROCESS_RESULT_TIMEOUT))
+                    except (BrokenProcessPool, FutureTimeoutError, CancelledError):
+                        raise
+                    except Exception as e:
+                        results[key] = e
+                return results
+            except (BrokenProcessPool, FutureTimeoutError, CancelledError, RuntimeError) as e:
+                # 子进程异常退出或卡死（或其他线程已放弃进程池）：终止子进程，改用线程池，
+                # 未取得结果的图片（包括被取消的任务）在本进程重新解码
+                if self._abandon_processes(processes):
+                    reason = "卡死" if isinstance(e, FutureTimeoutError) else "异常退出"
+                    print(f"⚠️ 解码子进程{reason}，改用线程池解码")
+                # 已完成的结果照常取出（同时释放其共享内存）
+                for key, future in zip(keys, futures):
+                    if key not in results and future.done() and not future.cancelled() \
+                            and future.exception() is None:
+                        results[key] = _take_shared_array(*future.result())
+                keys = [key for key in keys
+                        if key not in results or isinstance(results[key], Exception)]
+
+        def decode(key):
+            try:
+                return decode_image(contents[key], max_side)
+            except Exception as e:
+                return e
+
+        for key, value in zip(keys, self.map(decode, keys)):
+            results[key] = value
+        return results
+
+    def _abandon_processes(self, processes):
+        """
+        终止 processes 的所有子进程并切换到线程后端（已提交的任务不再等待）
+        其他线程已经放弃该进程池时不做任何事，返回 False
+        """
+        with self._switch_lock:
+            if processes is None or self._processes is not processes:
+                return False
+            self._processes = None
+            self.backend = "thread"
+        # ProcessPoolExecutor 没有公开的终止接口，卡死的子进程需要直接终止
+        for process in list((getattr(processes, '_processes', None) or {}).values()):
+            process.terminate()
+        processes.shutdown(wait=False, cancel_futures=True)
+        return True
+
+    def close(self):
+        if self._threads is not None:
+            self._threads.shutdown(wait=False)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False)
+
@@ -0,0 +1,240 @@
+"""
+持久化磁盘图片缓存
+按 URL 哈希存储原始字节及 ETag/Last-Modified，支持条件请求重新验证、
+按字节上限 LRU 淘汰，多个 ComfyUI 进程可共享同一目录
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 文件格式: [4字节头长度][JSON头][原始图片字节]
+_HEADER_LEN = struct.Struct('>I')
+_ENTRY_SUFFIX = '.bin'
+
+
+class DiskCacheEntry:
+    """磁盘缓存条目"""
+
+    __slots__ = ('url', 'content', 'etag', 'last_modified', 'fetched_at')
+
+    def __init__(self, url, content, etag=None, last_modified=None, fetched_at=0.0):
+        self.url = url
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def is_fresh(self, max_age):
+        return (time.time() - self.fetched_at) < max_age
+
+    def validator_headers(self):
+        """生成条件请求头"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class _DirLock:
+    """跨进程目录锁（基于锁文件）"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def acquire(self, blocking=True):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                fcntl.flock(self._fd, flags)
+            else:
+                mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+                msvcrt.locking(self._fd, mode, 1)
+            return True
+        except OSError:
+            os.close(self._fd)
+            self._fd = None
+            return False
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class DiskImageCache:
+    """
+    内容寻址的磁盘图片缓存
+    - 写入使用临时文件 + os.replace，读取方永远不会看到半写入的文件
+    - 命中时更新文件 mtime，淘汰时按 mtime 从旧到新删除（LRU）
+    - 淘汰过程持有跨进程锁，其他进程跳过本轮淘汰
+    """
+
+    def __init__(self, root, max_bytes, max_age=24 * 3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._lock_path = os.path.join(root, '.evict.lock')
+        self._approx_bytes = self._scan_total()
+
+    def _path(self, url):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, digest[:2], digest + _ENTRY_SUFFIX)
+
+    def _iter_entries(self):
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            try:
+                for entry in os.scandir(sub.path):
+                    if entry.name.endswith(_ENTRY_SUFFIX):
+                        yield entry
+            except FileNotFoundError:
+                continue
+
+    def _scan_total(self):
+        total = 0
+        for entry in self._iter_entries():
+            try:
+                total += entry.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    def get(self, url):
+        """读取缓存条目，不存在或损坏时返回 None"""
+        path = self._path(url)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except (FileNotFoundError, PermissionError):
+            return None
+
+        try:
+            (header_len,) = _HEADER_LEN.unpack_from(data, 0)
+            start = _HEADER_LEN.size
+            header = json.loads(data[start:start + header_len].decode('utf-8'))
+            content = data[start + header_len:]
+        except (struct.error, ValueError):
+            self._remove(path)
+            return None
+
+        if header.get('url') != url or len(content) != header.get('size'):
+            return None
+
+        self._touch(path)
+        return DiskCacheEntry(url, content, header.get('etag'),
+                              header.get('last_modified'), header.get('fetched_at', 0.0))
+
+    def put(self, url, content, etag=None, last_modified=None):
+        """原子写入缓存条目"""
+        path = self._path(url)
+        header = json.dumps({
+            'url': url,
+            'size': len(content),
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': time.time(),
+        }).encode('utf-8')
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_HEADER_LEN.pack(len(header)))
+                f.write(header)
+                f.write(content)
+            # 覆盖已有条目（如 304 刷新）时只计入大小差值，避免累计字节虚高触发多余的淘汰扫描
+            old_size = self._size(path)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            return
+
+        with self._lock:
+            self._approx_bytes += _HEADER_LEN.size + len(header) + len(content) - old_size
+            over_budget = self._approx_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def refresh(self, entry):
+        """304 重新验证成功后刷新条目时间戳"""
+        self.put(entry.url, entry.content, entry.etag, entry.last_modified)
+
+    def evict(self):
+        """按 LRU 淘汰直到低于字节上限"""
+        lock = _DirLock(self._lock_path)
+        if not lock.acquire(blocking=False):
+            return
+        try:
+            entries = []
+            total = 0
+            for entry in self._iter_entries():
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+            if total > self.max_bytes:
+                # 淘汰到上限的 90%，避免每次写入都触发扫描
+                target = int(self.max_bytes * 0.9)
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= target:
+                        break
+                    if self._remove(path):
+                        total -= size
+
+            with self._lock:
+                self._approx_bytes = total
+        finally:
+            lock.release()
+
+    @staticmethod
+    def _touch(path):
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _size(path):
+        try:
+            return os.stat(path).st_size
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
@@ -0,0 +1,245 @@
+"""
+图片并发下载引擎
+线程池 + 连接复用的 requests.Session，支持按主机限流与指数退避重试，
+可选接入磁盘缓存（条件请求重新验证）、失败 URL 负缓存与按主机熔断
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from .failure_cache import HOST_ERROR_CLASSES
+from .lazy_imports import lazy_module
+
+requests = lazy_module('requests')
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# 可重试的 HTTP 状态码（限流 / 服务端临时错误）
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def url_host(url):
+    """提取 URL 的主机名（用于按主机限流）"""
+    try:
+        return urlsplit(url).netloc.lower()
+    except ValueError:
+        return ''
+
+
+def status_error_class(status):
+    """HTTP 状态码对应的错误类别"""
+    if status in (404, 410):
+        return 'not_found'
+    if status == 429:
+        return 'throttled'
+    if status in RETRY_STATUS_CODES or status >= 500:
+        return 'server_error'
+    return 'client_error'
+
+
+class DownloadResult:
+    """单个 URL 的下载结果"""
+
+    __slots__ = ('url', 'content', 'error', 'error_class', 'status', 'attempts', 'elapsed',
+                 'source')
+
+    # source 取值
+    SOURCE_NETWORK = 'network'          # 完整网络下载
+    SOURCE_DISK = 'disk'                # 磁盘缓存新鲜命中
+    SOURCE_REVALIDATED = 'revalidated'  # 磁盘缓存过期，304 重新验证后命中
+    SOURCE_SKIPPED = 'skipped'          # 负缓存或主机熔断，未发出请求
+
+    def __init__(self, url, content=None, error=None, status=None, attempts=0,
+                 elapsed=0.0, source=SOURCE_NETWORK, error_class=None):
+        self.url = url
+        self.content = content
+        self.error = error
+        self.error_class = error_class
+        self.status = status
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.source = source
+
+    @property
+    def ok(self):
+        return self.content is not None
+
+
+class ImageDownloader:
+    """
+    并发图片下载器
+    - 共享 Session，连接池大小与并发数一致，保持 keep-alive
+    - 每个主机一个信号量，限制同一 CDN 的并发连接数
+    - 网络错误 / 429 / 5xx 按指数退避重试
+    - failures（FailureCache）中未过期的失败 URL 直接跳过，新的失败按错误类别记录
+    - breaker（HostCircuitBreaker）熔断中的主机不再发出请求
+    """
+
+    def __init__(self, max_workers=8, per_host_limit=4, retries=2,
+                 backoff=0.5, timeout=30, failures=None, breaker=None):
+        self.max_workers = max(1, int(max_workers))
+        self.per_host_limit = max(1, int(per_host_limit))
+        self.retries = max(0, int(retries))
+        self.backoff = backoff
+        self.timeout = timeout
+        self.failures = failures
+        self.breaker = breaker
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.verify = False
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self.max_workers,
+            pool_maxsize=self.max_workers,
+            max_retries=0,
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+        # 所有 fetch_all 调用共享同一个线程池，总并发始终不超过 max_workers
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='excel_sku_dl')
+
+    def config_key(self):
+        return (self.max_workers, self.per_host_limit, self.retries)
+
+    def _host_semaphore(self, url):
+        host = url_host(url)
+        with self._host_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_slots[host] = slot
+            return slot
+
+    def _sleep_backoff(self, attempt):
+        # 指数退避 + 抖动，避免所有线程同时重试
+        delay = self.backoff * (2 ** attempt)
+        time.sleep(delay + random.uniform(0, delay / 2))
+
+    def fetch(self, url, cache=None):
+        """
+        下载单个 URL（带重试），返回 DownloadResult
+        cache: 可选 DiskImageCache，新鲜条目直接返回，过期条目发送条件请求
+        """
+        start = time.perf_counter()
+        result = DownloadResult(url)
+
+        failed = self.failures.get(url) if self.failures is not None else None
+        if failed is not None:
+            result.error = f"近期失败，跳过: {failed.error}"
+            result.error_class = failed.error_class
+            result.source = DownloadResult.SOURCE_SKIPPED
+            result.elapsed = time.perf_counter() - start
+            return result
+
+        cached = cache.get(url) if cache is not None else None
+        if cached is not None and cached.is_fresh(cache.max_age):
+            result.content = cached.content
+            result.source = DownloadResult.SOURCE_DISK
+            result.elapsed = time.perf_counter() - start
+            return result
+        request_headers = cached.validator_headers() if cached is not None else None
+
+        slot = self._host_semaphore(url)
+        host = url_host(url)
+        breaker = self.breaker
+
+        for attempt in range(self.retries + 1):
+            retryable = False
+            try:
+                with slot:
+                    # 等待连接槽位期间主机可能已经熔断（重试时保留上一次的错误）
+                    if breaker is not None and not breaker.allow(host):
+                        if attempt == 0:
+                            result.error = f"主机熔断中: {host}"
+                            result.error_class = 'circuit_open'
+                            result.source = DownloadResult.SOURCE_SKIPPED
+                        break
+                    result.attempts = attempt + 1
+                    response = self.session.get(url, headers=request_headers,
+                                                timeout=self.timeout)
+                result.status = response.status_code
+                if response.status_code == 304 and cached is not None:
+                    cache.refresh(cached)
+                    result.content = cached.content
+                    result.source = DownloadResult.SOURCE_REVALIDATED
+                    result.error = None
+                elif response.status_code in RETRY_STATUS_CODES:
+                    retryable = True
+                    result.error = f"HTTP {response.status_code}"
+                    result.error_class = status_error_class(response.status_code)
+                else:
+                    response.raise_for_status()
+                    result.content = response.content
+                    result.error = None
+                    if cache is not None:
+                        cache.put(url, result.content,
+                                  etag=response.headers.get('ETag'),
+                                  last_modified=response.headers.get('Last-Modified'))
+            except requests.exceptions.Timeout as e:
+                retryable = True
+                result.error = str(e)
+                result.error_class = 'timeout'
+            except requests.exceptions.ConnectionError as e:
+                retryable = True
+                result.error = str(e)
+                result.error_class = 'connection'
+            except requests.exceptions.HTTPError as e:
+                result.error = str(e)
+                result.error_class = status_error_class(result.status)
+            except requests.exceptions.RequestException as e:
+                result.error = str(e)
+                result.error_class = 'request_error'
+
+            # 每次发出的请求都记录到熔断器：成功（200 / 304）清零连续失败并结束探测
+            if breaker is not None:
+                if result.content is None and result.error_class in HOST_ERROR_CLASSES:
+                    breaker.failure(host)
+                else:
+                    breaker.success(host)
+
+            if result.content is not None or not retryable or attempt >= self.retries:
+                break
+            self._sleep_backoff(attempt)
+
+        if result.content is None and cached is not None:
+            # 网络失败时退回过期的磁盘副本
+            result.content = cached.content
+            result.source = DownloadResult.SOURCE_DISK
+            result.error = None
+            result.error_class = None
+        elif result.content is None and result.source != DownloadResult.SOURCE_SKIPPED:
+            if self.failures is not None and result.error_class != 'circuit_open':
+                self.failures.record(url, result.error_class, result.error)
+
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def fetch_all(self, urls, cache=None, on_result=None):
+        """
+        并发下载一组 URL（自动去重）
+        返回 {url: DownloadResult}，顺序与输入一致
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        results = {}
+        if not unique_urls:
+            return results
+
+        for result in self._executor.map(lambda url: self.fetch(url, cache), unique_urls):
+            results[result.url] = result
+            if on_result:
+                on_result(result)
+        return results
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
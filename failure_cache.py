@@ -0,0 +1,149 @@
+"""
+失败 URL 负缓存与按主机熔断
+- FailureCache: 记录下载/解码失败的 URL，按错误类别设置不同的有效期，
+  有效期内再次请求直接跳过，不再等待超时
+- HostCircuitBreaker: 同一主机连续失败（超时、连接错误、5xx）达到阈值后熔断，
+  冷却期内该主机的请求立即失败；冷却结束后放行一个探测请求，成功则恢复
+两者都是进程内共享状态，跨多次运行生效
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# 各错误类别的负缓存有效期（秒）：数据错误保留较久，临时故障很快重试
+FAILURE_TTLS = {
+    'not_found': 3600,       # 404 / 410
+    'client_error': 1800,    # 其他 4xx
+    'request_error': 1800,   # 无效 URL、重定向过多等
+    'decode': 3600,          # 内容不是可解码的图片
+    'server_error': 120,     # 5xx
+    'throttled': 60,         # 429
+    'timeout': 300,
+    'connection': 300,
+}
+
+# 计入主机熔断的错误类别（说明主机本身不可用，而不是单个 URL 有问题）；
+# 429 限流说明主机在线，不计入
+HOST_ERROR_CLASSES = {'server_error', 'timeout', 'connection'}
+
+
+class FailureEntry:
+    """负缓存条目"""
+
+    __slots__ = ('error_class', 'error', 'expires')
+
+    def __init__(self, error_class, error, expires):
+        self.error_class = error_class
+        self.error = error
+        self.expires = expires
+
+
+class FailureCache:
+    """
+    失败 URL 负缓存（线程安全，条目数超出上限时淘汰最早的条目）
+    enabled 为 False 时不跳过任何 URL，但仍然记录失败
+    """
+
+    def __init__(self, ttls=None, max_entries=100000):
+        self.ttls = dict(FAILURE_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self.enabled = True
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.skips = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, url):
+        """返回未过期的失败记录，没有时为 None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            if entry.expires <= time.time():
+                del self._entries[url]
+                return None
+            self.skips += 1
+            return entry
+
+    def record(self, url, error_class, error):
+        ttl = self.ttls.get(error_class, 0)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries.pop(url, None)
+            self._entries[url] = FailureEntry(error_class, error, time.time() + ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, url):
+        with self._lock:
+            self._entries.pop(url, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'skips': self.skips}
+
+
+class HostCircuitBreaker:
+    """
+    按主机熔断器
+    threshold 为连续失败次数阈值（0 表示不熔断），cooldown 为熔断持续秒数
+    """
+
+    def __init__(self, threshold=5, cooldown=60):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self.trips = 0
+
+    def allow(self, host):
+        """是否允许向该主机发送请求（冷却结束后只放行一个探测请求）"""
+        if self.threshold <= 0:
+            return True
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state['open_until'] is None:
+                return True
+            if state['probing'] or time.monotonic() < state['open_until']:
+                return False
+            state['probing'] = True
+            return True
+
+    def success(self, host):
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    def failure(self, host):
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            state = self._hosts.setdefault(host, {'failures': 0, 'open_until': None,
+                                                  'probing': False})
+            state['failures'] += 1
+            # 探测失败或连续失败达到阈值：（重新）熔断
+            if state['probing'] or (state['open_until'] is None
+                                    and state['failures'] >= self.threshold):
+                if state['open_until'] is None:
+                    self.trips += 1
+                state['open_until'] = time.monotonic() + self.cooldown
+                state['probing'] = False
+
+    def open_hosts(self):
+        """当前处于熔断状态的 {主机: 连续失败次数}"""
+        with self._lock:
+            return {host: state['failures'] for host, state in self._hosts.items()
+                    if state['open_until'] is not None}
+
+    def reset(self):
+        with self._lock:
+            self._hosts.clear()
@@ -0,0 +1,73 @@
+"""
+运行内图片去重计划
+根据 parse_sku_groups 的结果统计每个图片键被引用的次数：
+- 同一个键在本次运行中只下载/解码一次，第一个请求者负责加载，
+  并发的其他请求等待同一个 Future（合并进行中的请求）
+- 加载结果（只读 uint8 数组）在仍有分组引用期间保留，与内存缓存容量无关，
+  最后一个引用取走后释放
+"""
+
+import threading
+from collections import Counter
+from concurrent.futures import Future
+
+
+class RunImagePlan:
+    """单次 load_sku_data 的图片去重计划"""
+
+    def __init__(self, refs):
+        self._refs = dict(refs)
+        self._futures = {}
+        self._lock = threading.Lock()
+        self.references = sum(self._refs.values())
+        self.unique = len(self._refs)
+        self.loads = 0
+        self.shared = 0
+
+    @classmethod
+    def from_groups(cls, groups, key_fn):
+        refs = Counter()
+        for url, count in groups.url_counts():
+            refs[key_fn(url)] += count
+        return cls(refs)
+
+    def claim(self, keys):
+        """
+        登记一组（不重复的）键
+        返回 (owned, shared)：owned 为调用方负责加载并 set_result 的 {键: Future}，
+        shared 为已由其他请求加载或正在加载的 {键: Future}
+        """
+        owned, shared = {}, {}
+        with self._lock:
+            for key in keys:
+                future = self._futures.get(key)
+                if future is None:
+                    future = self._futures[key] = Future()
+                    owned[key] = future
+                    self.loads += 1
+                else:
+                    shared[key] = future
+                    self.shared += 1
+        return owned, shared
+
+    def release(self, key, count=1):
+        """消耗 count 次引用，引用用尽时释放该键的共享结果"""
+        with self._lock:
+            remaining = self._refs.get(key, 0) - count
+            if remaining > 0:
+                self._refs[key] = remaining
+            else:
+                self._refs.pop(key, None)
+                self._futures.pop(key, None)
+
+    def dedup_ratio(self):
+        """被去重省掉的引用比例"""
+        return 1 - self.unique / self.references if self.references else 0.0
+
+    def report_line(self):
+        return (f"URL去重: {self.references} 次引用 / {self.unique} 个唯一图片, "
+                f"去重率 {self.dedup_ratio() * 100:.1f}%, 运行内复用 {self.shared} 次")
+
+    def to_dict(self):
+        return {'references': self.references, 'unique': self.unique, 'loads': self.loads,
+                'shared': self.shared, 'dedup_ratio': round(self.dedup_ratio(), 4)}
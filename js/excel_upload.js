@@ -27,7 +27,7 @@ app.registerExtension({
 function showUploadDialog(node) {
     const fileInput = document.createElement("input");
     fileInput.type = "file";
-    fileInput.accept = ".xlsx,.xls,.xlsm";
+    fileInput.accept = ".xlsx,.xls,.xlsm,.csv,.tsv,.parquet,.pq,.arrow,.feather,.ipc";
     fileInput.style.display = "none";
     document.body.appendChild(fileInput);
 
@@ -51,6 +51,20 @@ async function uploadExcelFile(file, node) {
         const formData = new FormData();
         formData.append("file", file);
 
+        // 让服务器按节点当前的工作表和列设置在后台预解析
+        formData.append("preparse", "true");
+        for (const name of ["sheet_name", "combined_sku_col", "sku_col", "pcs_col", "url_col", "start_row"]) {
+            const widget = node.widgets?.find(w => w.name === name);
+            if (widget && widget.value !== undefined && widget.value !== null) {
+                formData.append(name, String(widget.value));
+            }
+        }
+        // 节点开启 parquet_sidecar 时，同时在后台生成 Parquet 副本
+        const sidecarWidget = node.widgets?.find(w => w.name === "parquet_sidecar");
+        if (sidecarWidget?.value) {
+            formData.append("sidecar", "true");
+        }
+
         // 发送到自定义上传端点
         const response = await api.fetchApi("/excel_sku_loader/upload", {
             method: "POST",
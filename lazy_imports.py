@@ -0,0 +1,118 @@
+"""
+延迟导入与导入耗时分析
+ComfyUI 每次启动都会导入所有自定义节点包；pandas / numpy / torch / PIL / requests
+改为首次使用时才导入（首次执行节点或调用上传、预热端点时），不影响未使用本节点的启动
+
+设置环境变量 EXCEL_SKU_LOADER_PROFILE_IMPORTS=1 时输出导入耗时报告：
+包导入耗时与新加载的模块数，以及每个延迟模块实际导入时的耗时和触发位置
+"""
+
+import importlib
+import os
+import sys
+import threading
+import time
+import types
+
+PROFILE_ENV = 'EXCEL_SKU_LOADER_PROFILE_IMPORTS'
+
+_load_lock = threading.RLock()
+
+
+class ImportProfile:
+    """包导入与延迟导入的耗时记录（始终记录，开启分析时才输出）"""
+
+    def __init__(self):
+        self.enabled = os.environ.get(PROFILE_ENV, '').strip().lower() in ('1', 'true', 'yes', 'on')
+        self.package_seconds = None
+        self.package_modules = []
+        self.deferred = []
+        self._started = None
+        self._before = None
+
+    def begin(self):
+        self._before = set(sys.modules)
+        self._started = time.perf_counter()
+
+    def end(self):
+        self.package_seconds = time.perf_counter() - self._started
+        self.package_modules = sorted(set(sys.modules) - self._before)
+        self._before = None
+        if self.enabled:
+            for line in self.report_lines():
+                print(line)
+
+    def record(self, name, seconds, modules, trigger):
+        entry = {'module': name, 'seconds': round(seconds, 4), 'modules': modules, 'trigger': trigger}
+        self.deferred.append(entry)
+        if self.enabled:
+            print(f"⏱️ 延迟导入 {name}: {seconds * 1000:.0f} ms, {modules} 个模块 (触发: {trigger})")
+
+    def summary(self):
+        top_level = sorted({name.split('.')[0] for name in self.package_modules})
+        # Python 3.10+ 可区分标准库与第三方模块
+        stdlib = getattr(sys, 'stdlib_module_names', frozenset())
+        return {
+            'package_seconds': None if self.package_seconds is None else round(self.package_seconds, 4),
+            'package_modules': len(self.package_modules),
+            'top_level_modules': top_level,
+            'third_party_modules': [name for name in top_level
+                                    if name not in stdlib and not name.startswith('_')
+                                    and name != __package__],
+            'deferred': list(self.deferred),
+        }
+
+    def report_lines(self):
+        summary = self.summary()
+        lines = [f"⏱️ Excel SKU Loader 导入耗时: {summary['package_seconds'] * 1000:.0f} ms, "
+                 f"新加载 {summary['package_modules']} 个模块"]
+        lines.append(f"   非标准库模块: {', '.join(summary['third_party_modules']) or '无'}")
+        for entry in summary['deferred']:
+            lines.append(f"   已导入 {entry['module']}: {entry['seconds'] * 1000:.0f} ms ({entry['trigger']})")
+        return lines
+
+
+import_profile = ImportProfile()
+
+
+class LazyModule(types.ModuleType):
+    """
+    模块代理：首次访问属性时导入真实模块，并把其属性复制到代理上，
+    之后的属性访问与直接导入的模块一样快
+    """
+
+    def __getattr__(self, attr):
+        return getattr(_resolve(self), attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self.__name__}'>"
+
+
+def _resolve(proxy):
+    name = proxy.__dict__['__lazy_name__']
+    with _load_lock:
+        module = proxy.__dict__.get('__lazy_module__')
+        if module is not None:
+            return module
+        loaded = name in sys.modules
+        count = len(sys.modules)
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        if not loaded:
+            caller = sys._getframe(2)
+            trigger = f"{os.path.basename(caller.f_code.co_filename)}:{caller.f_lineno}"
+            import_profile.record(name, time.perf_counter() - started,
+                                  len(sys.modules) - count, trigger)
+        proxy.__dict__.update(module.__dict__)
+        proxy.__dict__['__lazy_module__'] = module
+        return module
+
+
+def lazy_module(name):
+    """返回 name 模块的延迟代理（已导入的模块直接返回）"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    proxy = LazyModule(name)
+    proxy.__dict__['__lazy_name__'] = name
+    return proxy
@@ -0,0 +1,95 @@
+"""
+进程内图片内存缓存
+按字节预算的真 LRU 缓存，条目为只读 uint8 数组，命中时零拷贝返回
+"""
+
+import threading
+from collections import OrderedDict
+
+from .lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+
+
+class ImageMemoryCache:
+    """
+    线程安全的 LRU 图片缓存
+    - 容量按字节计算（数组 nbytes），而非图片张数
+    - 命中时 move_to_end，淘汰最久未使用的条目
+    - 存入的数组被设为只读，调用方可直接共享，无需 copy
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        """查询缓存，命中返回只读数组，未命中返回 None"""
+        with self._lock:
+            array = self._entries.get(key)
+            if array is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return array
+
+    def put(self, key, array):
+        """存入数组（转为只读 uint8），返回缓存中的只读数组"""
+        array = np.ascontiguousarray(array, dtype=np.uint8)
+        array.flags.writeable = False
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old.nbytes
+
+            # 单张超过总预算时不缓存
+            if array.nbytes > self.max_bytes:
+                return array
+
+            self._entries[key] = array
+            self.current_bytes += array.nbytes
+            self._evict_locked()
+        return array
+
+    def resize(self, max_bytes):
+        """调整字节预算，缩小时立即淘汰"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict_locked()
+
+    def _evict_locked(self):
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """返回统计快照"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
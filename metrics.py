@@ -0,0 +1,112 @@
+"""
+运行指标
+按阶段累计耗时和数量，按主机统计下载延迟分位数，最终导出为 JSON
+流水线线程会并发写入，所有更新都在锁内完成
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+from .downloader import DownloadResult, url_host
+from .lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+
+# 固定的阶段顺序（未出现的阶段不输出）
+STAGES = ("workbook_fetch", "excel_read", "index", "parse", "download", "decode", "resize", "assembly")
+
+
+class RunMetrics:
+    """
+    单次 load_sku_data 的指标
+    阶段耗时为各线程耗时之和（并行阶段可能大于墙钟时间），total_seconds 为墙钟时间
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._stages = defaultdict(lambda: {'seconds': 0.0, 'count': 0})
+        self._host_latency = defaultdict(list)
+        self._host_bytes = defaultdict(int)
+        self._host_failed = defaultdict(int)
+        self._host_skipped = defaultdict(int)
+        self.info = OrderedDict()
+
+    @contextmanager
+    def stage(self, name, count=1):
+        """计时一段代码并计入阶段 name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start, count)
+
+    def add_time(self, name, seconds, count=1):
+        with self._lock:
+            stage = self._stages[name]
+            stage['seconds'] += seconds
+            stage['count'] += count
+
+    def add(self, name, key, value):
+        """累加阶段的附加数值（如字节数、失败数）"""
+        with self._lock:
+            stage = self._stages[name]
+            stage[key] = stage.get(key, 0) + value
+
+    def set(self, name, key, value):
+        with self._lock:
+            self._stages[name][key] = value
+
+    def record_download(self, result):
+        """
+        记录一次下载结果：网络请求（含 304 验证）计入主机延迟，磁盘缓存命中不计，
+        负缓存/熔断跳过的请求单独计数
+        """
+        if result.ok and result.source == DownloadResult.SOURCE_DISK:
+            return
+        host = url_host(result.url)
+        with self._lock:
+            if result.source == DownloadResult.SOURCE_SKIPPED:
+                self._host_skipped[host] += 1
+            elif result.ok:
+                self._host_latency[host].append(result.elapsed)
+                if result.content is not None and result.source == DownloadResult.SOURCE_NETWORK:
+                    self._host_bytes[host] += len(result.content)
+            else:
+                self._host_failed[host] += 1
+
+    def _host_summary(self):
+        hosts = OrderedDict()
+        for host in sorted(set(self._host_latency) | set(self._host_failed) | set(self._host_skipped)):
+            latency = np.asarray(self._host_latency.get(host, []), dtype=np.float64) * 1000
+            summary = OrderedDict(requests=int(latency.size),
+                                  failed=self._host_failed.get(host, 0),
+                                  skipped=self._host_skipped.get(host, 0),
+                                  bytes=self._host_bytes.get(host, 0))
+            if latency.size:
+                p50, p90, p99 = np.percentile(latency, [50, 90, 99])
+                summary.update(p50_ms=round(p50, 2), p90_ms=round(p90, 2),
+                               p99_ms=round(p99, 2), max_ms=round(float(latency.max()), 2))
+            hosts[host] = summary
+        return hosts
+
+    def to_dict(self):
+        with self._lock:
+            stages = OrderedDict()
+            for name in STAGES + tuple(sorted(set(self._stages) - set(STAGES))):
+                if name in self._stages:
+                    stage = dict(self._stages[name])
+                    stage['seconds'] = round(stage['seconds'], 4)
+                    stages[name] = stage
+            return OrderedDict([
+                ('total_seconds', round(time.perf_counter() - self._start, 4)),
+                *self.info.items(),
+                ('stages', stages),
+                ('hosts', self._host_summary()),
+            ])
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False)
@@ -1,20 +1,54 @@
 # ComfyUI/custom_nodes/excel_sku_collage/nodes.py
 
-import pandas as pd
-import requests
-from PIL import Image
-from io import BytesIO
-import numpy as np
-import torch
-from collections import defaultdict, OrderedDict
+from collections import Counter, OrderedDict
+from itertools import islice
+import logging
 import os
 import warnings
 import folder_paths
+import json
 from datetime import datetime
 import re
+import threading
+import time
+import uuid
+
+from .batch_cache import BatchResultCache, content_validator, group_fingerprint, image_digest
+from .batching import (BatchAssembler, batch_nbytes, canvas_for, fit_within, padding_ratio,
+                       plan_size_buckets)
+from .decode_pool import BACKENDS, DecodePool
+from .disk_cache import DiskImageCache
+from .image_plan import RunImagePlan
+from .imaging import REDUCING_GAP
+from .lazy_imports import lazy_module
+from .downloader import DownloadResult, ImageDownloader
+from .failure_cache import FailureCache, HostCircuitBreaker
+from .memory_cache import ImageMemoryCache
+from .metrics import RunMetrics
+from .pipeline import ordered_lookahead
+from .remote_workbook import RemoteWorkbookCache
+from .row_index import RowIndexStore, fill_combined
+from .sharding import SHARD_MODES, ShardAssignment, shard_range_error
+from .sku_filter import SkuFilter
+from .sku_groups import SkuGroups
+from .workbook import load_table, detect_format, ParquetSidecars, SUPPORTED_EXTENSIONS
+
+# 重依赖在首次执行节点时才导入，不拖慢 ComfyUI 启动
+pd = lazy_module('pandas')
+requests = lazy_module('requests')
+Image = lazy_module('PIL.Image')
+np = lazy_module('numpy')
+torch = lazy_module('torch')
 
 warnings.filterwarnings('ignore', message='Unverified HTTPS request')
 
+# 逐图片/逐分组的明细日志为 DEBUG 级别，默认不输出（verbose_log 开启）
+logger = logging.getLogger(__name__)
+
+def is_true(value):
+    """解析布尔参数（表单/JSON 中的 "false"、"0" 等字符串视为假）"""
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
 def is_url(path):
     """检测是否为 HTTP/HTTPS URL"""
     if not path:
@@ -22,11 +56,57 @@ def is_url(path):
     path_lower = path.strip().lower()
     return path_lower.startswith('http://') or path_lower.startswith('https://')
 
-# 注册Excel文件夹 - 直接使用input目录
+def column_letter_to_index(col, default=0):
+    """
+    Excel 列字母转为 0 基列号（A=0, Z=25, AA=26 ... XFD=16383）
+    无效列名返回 default
+    """
+    letters = str(col).strip().upper() if col is not None else ''
+    if not letters or len(letters) > 3 or not letters.isascii() or not letters.isalpha():
+        return default
+
+    index = 0
+    for ch in letters:
+        index = index * 26 + (ord(ch) - ord('A') + 1)
+    if index > 16384:
+        return default
+    return index - 1
+
+# PCS 按 int32 存储（int32 最大值）
+PCS_MAX = 2 ** 31 - 1
+
+# 注册Excel文件夹 - 直接使用input目录（上传时才创建）
 excel_folder = folder_paths.get_input_directory()
-# 确保目录存在
-if not os.path.exists(excel_folder):
-    os.makedirs(excel_folder)
+
+# 磁盘图片缓存目录 - ComfyUI 启动时会清空 temp 目录，因此放在与其同级的 cache 目录
+image_cache_folder = os.path.join(
+    os.path.dirname(os.path.abspath(folder_paths.get_temp_directory())),
+    'cache', 'excel_sku_loader', 'images'
+)
+
+# 超出内存预算的批次张量溢出到此目录的内存映射文件（位于 temp，ComfyUI 启动时清空）
+spill_folder = os.path.join(folder_paths.get_temp_directory(), 'excel_sku_loader_spill')
+
+# 分片清单目录（位于 output，协调端从各实例收集）
+shard_manifest_folder = os.path.join(folder_paths.get_output_directory(), 'excel_sku_loader', 'shards')
+
+# 输出精度：IMAGE 按约定为 0~1 浮点，float16 内存减半
+OUTPUT_PRECISIONS = ["float32", "float16"]
+
+# 报告中列出的失败图片 URL 上限
+MAX_REPORTED_FAILURES = 200
+
+# 未设置 cache_size_mb 时，cache_size（旧版按张数的缓存大小）每张图片折算的内存预算 (MB)
+LEGACY_IMAGE_CACHE_MB = 10
+
+# 远程 Excel 工作簿缓存（ETag/Last-Modified 条件请求）
+remote_workbooks = RemoteWorkbookCache(os.path.join(os.path.dirname(image_cache_folder), 'workbooks'))
+
+# 组合SKU行索引（每个工作簿版本建立一次，过滤时只处理匹配的行）
+row_indexes = RowIndexStore(os.path.join(os.path.dirname(image_cache_folder), 'row_index'))
+
+# Excel 工作簿的 Parquet 副本（每个工作簿版本转换一次，之后按列内存映射读取）
+sidecars = ParquetSidecars(os.path.join(os.path.dirname(image_cache_folder), 'sidecars'))
 
 class ExcelSKULoader:
     """
@@ -35,10 +115,42 @@ class ExcelSKULoader:
     按组合SKU分批输出，每个组合SKU生成一个批次
     """
     
-    _image_cache = {}
-    _cache_max_size = 100
+    # 进程内共享的图片缓存（只读 uint8 数组，按字节 LRU）
+    _image_cache = ImageMemoryCache(1024 * 1024 * 1024)
     _cache_hits = 0
     _cache_misses = 0
+    _downloader = None
+    # 进程内共享的失败 URL 负缓存与按主机熔断（跨多次运行生效）
+    _failure_cache = FailureCache()
+    _host_breaker = HostCircuitBreaker()
+    _failed_urls = {}
+    _disk_cache = None
+    _active_disk_cache = None
+    # 本次运行使用的下载器（预热任务使用独立的下载器，不重建共享下载器）
+    _active_downloader = None
+    _next_group_offset = -1
+    _page_info = ""
+    _batch_bytes = 0
+    _spilled_bytes = 0
+    _spilled_batches = 0
+    _memory_budget = 0
+    _output_dtype = None  # 运行时为 torch.float32 / torch.float16
+    _max_side = 0
+    _decode_pool = None
+    _pipeline_depth = 0
+    _metrics = None
+    _plan = None
+    _batch_cache = None
+    _reused_batches = {}
+    _group_fingerprints = {}
+    _image_digests = {}
+    _shard = None
+    _group_offset = 0
+    _parquet_sidecar = False
+    _stats_lock = threading.Lock()
+    _prefetched = {}
+    _download_stats = {'fetched': 0, 'failed': 0, 'skipped': 0, 'bytes': 0, 'seconds': 0.0,
+                       'disk_hits': 0, 'revalidated': 0}
     
     @classmethod
     def INPUT_TYPES(cls):
@@ -47,7 +159,7 @@ class ExcelSKULoader:
                 "excel_file": ("STRING", {
                     "default": "",
                     "multiline": False,
-                    "placeholder": "支持本地路径或URL（如：file.xlsx 或 https://example.com/file.xlsx）"
+                    "placeholder": "支持本地路径或URL（如：file.xlsx、file.csv、file.parquet 或 https://example.com/file.xlsx）"
                 }),
                 "sheet_name": ("STRING", {
                     "default": "Sheet1",
@@ -101,24 +213,154 @@ class ExcelSKULoader:
             "optional": {
                 "filter_combined_sku": ("STRING", {
                     "default": "",
-                    "multiline": False,
-                    "placeholder": "留空处理全部，或输入特定组合SKU"
+                    "multiline": True,
+                    "placeholder": "留空处理全部；多个组合SKU用换行/逗号分隔，支持前缀 ABC-*、正则 re:^ABC",
+                    "tooltip": "整行先按精确值匹配：有与整行完全相同的组合SKU（如 A,B）时不拆分，也不按通配符/正则解释"
+                }),
+                "download_workers": ("INT", {
+                    "default": 8,
+                    "min": 1,
+                    "max": 64,
+                    "step": 1
+                }),
+                "per_host_limit": ("INT", {
+                    "default": 4,
+                    "min": 1,
+                    "max": 32,
+                    "step": 1
+                }),
+                "download_retries": ("INT", {
+                    "default": 2,
+                    "min": 0,
+                    "max": 10,
+                    "step": 1
+                }),
+                "disk_cache_mb": ("INT", {
+                    "default": 2048,
+                    "min": 0,
+                    "max": 102400,
+                    "step": 256
+                }),
+                "group_offset": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 1000000,
+                    "step": 1
+                }),
+                "group_limit": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 100000,
+                    "step": 1
+                }),
+                "max_side": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 64
+                }),
+                "decode_workers": ("INT", {
+                    "default": 4,
+                    "min": 1,
+                    "max": 64,
+                    "step": 1
+                }),
+                "decode_backend": (BACKENDS, {
+                    "default": "thread"
+                }),
+                "bucket_count": ("INT", {
+                    "default": 4,
+                    "min": 1,
+                    "max": 64,
+                    "step": 1
+                }),
+                "canvas_size": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 64
+                }),
+                "pipeline_depth": ("INT", {
+                    "default": 2,
+                    "min": 0,
+                    "max": 32,
+                    "step": 1
+                }),
+                "batch_cache_mb": ("INT", {
+                    "default": 512,
+                    "min": 0,
+                    "max": 65536,
+                    "step": 256
+                }),
+                "output_precision": (list(OUTPUT_PRECISIONS), {
+                    "default": "float32"
+                }),
+                "memory_budget_mb": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 1048576,
+                    "step": 256
+                }),
+                "verbose_log": ("BOOLEAN", {
+                    "default": False,
+                    "label_on": "详细日志",
+                    "label_off": "简要日志"
+                }),
+                "shard_index": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 1023,
+                    "step": 1
+                }),
+                "shard_count": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 1024,
+                    "step": 1
+                }),
+                "shard_mode": (SHARD_MODES, {
+                    "default": "hash"
+                }),
+                "negative_cache": ("BOOLEAN", {
+                    "default": True,
+                    "label_on": "跳过近期失败",
+                    "label_off": "重试全部"
+                }),
+                "host_failure_threshold": ("INT", {
+                    "default": 5,
+                    "min": 0,
+                    "max": 1000,
+                    "step": 1
+                }),
+                "parquet_sidecar": ("BOOLEAN", {
+                    "default": False,
+                    "label_on": "生成Parquet副本",
+                    "label_off": "直接读取"
+                }),
+                "cache_size_mb": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 65536,
+                    "step": 64,
+                    "tooltip": "内存图片缓存预算 (MB)，0 = 按 cache_size 张数换算"
                 }),
             }
         }
     
-    RETURN_TYPES = ("IMAGE", "STRING", "STRING", "STRING")
-    RETURN_NAMES = ("images", "labels", "combined_sku_info", "filename_prefix")
+    RETURN_TYPES = ("IMAGE", "STRING", "STRING", "STRING", "INT", "STRING")
+    RETURN_NAMES = ("images", "labels", "combined_sku_info", "filename_prefix", "next_group_offset",
+                    "metrics_json")
     FUNCTION = "load_sku_data"
     CATEGORY = "🎨 Smart Collage/Excel"
     OUTPUT_NODE = False
-    OUTPUT_IS_LIST = (True, True, False, True)  # images, labels, filename_prefix 输出为列表
+    OUTPUT_IS_LIST = (True, True, False, True, False, False)  # images, labels, filename_prefix 输出为列表
 
     @classmethod
     def IS_CHANGED(cls, excel_file, **kwargs):
-        # URL 每次都重新加载
+        # URL 使用 HEAD/条件请求生成指纹，未修改时 ComfyUI 可复用缓存结果
         if is_url(excel_file):
-            return float("nan")
+            fingerprint = remote_workbooks.fingerprint(excel_file.strip())
+            return fingerprint if fingerprint else float("nan")
 
         # 检查文件修改时间
         file_path = os.path.join(excel_folder, excel_file)
@@ -128,7 +370,11 @@ class ExcelSKULoader:
 
     @classmethod
     def VALIDATE_INPUTS(cls, **kwargs):
-        # 只验证 excel_file 参数
+        # 验证分片参数与 excel_file 参数
+        shard_error = shard_range_error(kwargs.get('shard_index', 0), kwargs.get('shard_count', 1))
+        if shard_error:
+            return shard_error
+
         excel_file = kwargs.get('excel_file', '')
 
         # 验证文件路径
@@ -151,8 +397,8 @@ class ExcelSKULoader:
         if not os.path.exists(file_path):
             return f"文件不存在: {file_path}"
 
-        if not file_path.lower().endswith(('.xlsx', '.xls', '.xlsm')):
-            return "文件必须是 Excel 格式 (.xlsx, .xls, .xlsm)"
+        if not file_path.lower().endswith(SUPPORTED_EXTENSIONS):
+            return f"不支持的文件格式，支持: {', '.join(SUPPORTED_EXTENSIONS)}"
 
         return True
 
@@ -160,38 +406,87 @@ class ExcelSKULoader:
                      pcs_col, url_col, start_row, use_cache=True, cache_size=100,
                      label_format="×{pcs}", output_mode="by_combined_sku",
                      filename_prefix="%date:yyyy-MM-dd%/collage/",
-                     filter_combined_sku=""):
+                     filter_combined_sku="", download_workers=8, per_host_limit=4,
+                     download_retries=2, disk_cache_mb=2048, group_offset=0, group_limit=0,
+                     max_side=0, decode_workers=4, decode_backend="thread",
+                     bucket_count=4, canvas_size=0, pipeline_depth=2,
+                     verbose_log=False, batch_cache_mb=512, output_precision="float32",
+                     memory_budget_mb=0, shard_index=0, shard_count=1, shard_mode="hash",
+                     negative_cache=True, host_failure_threshold=5, parquet_sidecar=False,
+                     cache_size_mb=0):
         
-        self._cache_max_size = cache_size
+        self._image_cache.resize(self.image_cache_budget(cache_size, cache_size_mb))
         self._cache_hits = 0
         self._cache_misses = 0
+        self._prefetched = {}
+        self._download_stats = {'fetched': 0, 'failed': 0, 'skipped': 0, 'bytes': 0,
+                                'seconds': 0.0, 'disk_hits': 0, 'revalidated': 0}
+        self._failed_urls = OrderedDict()
+        self._active_disk_cache = None
+        self._active_downloader = None
+        self._next_group_offset = -1
+        self._page_info = ""
+        self._batch_bytes = 0
+        self._spilled_bytes = 0
+        self._spilled_batches = 0
+        self._memory_budget = memory_budget_mb * 1024 * 1024
+        self._output_dtype = getattr(torch, output_precision if output_precision in OUTPUT_PRECISIONS
+                                     else "float32")
+        self._max_side = max_side
+        self._decode_pool = self.get_decode_pool(decode_workers, decode_backend)
+        self._pipeline_depth = pipeline_depth
+        self._metrics = RunMetrics()
+        self._metrics.info['output_mode'] = output_mode
+        self._plan = None
+        self._reused_batches = {}
+        self._group_fingerprints = {}
+        self._image_digests = {}
+        self._shard = None
+        self._group_offset = group_offset
+        # 关闭负缓存时重试所有失败 URL，同时清除主机熔断状态
+        self._failure_cache.enabled = negative_cache
+        if not negative_cache:
+            self._host_breaker.reset()
+        self._host_breaker.threshold = host_failure_threshold
+        self._parquet_sidecar = parquet_sidecar
+        logger.setLevel(logging.DEBUG if verbose_log else logging.NOTSET)
         
         try:
             print("\n" + "="*80)
             print("🚀 开始加载 Excel SKU 数据")
             print("="*80)
             print(f"📊 缓存状态: {'启用' if use_cache else '禁用'}")
-            print(f"📦 当前缓存: {len(self._image_cache)}/{self._cache_max_size} 张图片")
+            cache_stats = self._image_cache.stats()
+            print(f"📦 当前缓存: {cache_stats['entries']} 张图片, "
+                  f"{cache_stats['bytes'] / 1024 / 1024:.0f}/{cache_stats['max_bytes'] / 1024 / 1024:.0f} MB")
             print(f"🔄 输出模式: {output_mode}")
 
+            if use_cache:
+                self._active_disk_cache = self.get_disk_cache(disk_cache_mb)
+
             # 1. 确定Excel文件路径或URL
             excel_file = excel_file.strip()
+            # 只读取映射用到的四列
+            table_columns = [
+                column_letter_to_index(combined_sku_col, 0),
+                column_letter_to_index(sku_col, 1),
+                column_letter_to_index(pcs_col, 2),
+                column_letter_to_index(url_col, 3),
+            ]
 
             # 检查是否为 URL
             if is_url(excel_file):
                 print(f"\n📖 从URL加载Excel文件: {excel_file}")
                 try:
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                    }
-                    print(f"   🌐 下载中...")
-                    response = requests.get(excel_file, headers=headers, timeout=60, verify=False)
-                    response.raise_for_status()
-
-                    # 从 BytesIO 读取 Excel
-                    excel_data = BytesIO(response.content)
-                    df = pd.read_excel(excel_data, sheet_name=sheet_name, header=None)
-                    print(f"   ✅ 成功下载并读取 {len(df)} 行数据")
+                    print("   🌐 检查远程文件...")
+                    with self._metrics.stage('workbook_fetch'):
+                        local_path, downloaded = remote_workbooks.fetch(excel_file)
+                    self._metrics.set('workbook_fetch', 'downloaded', downloaded)
+                    print(f"   {'✅ 已下载新版本' if downloaded else '♻️ 远程文件未修改 (304)，使用本地缓存'}")
+
+                    table_path = local_path
+                    df, from_cache = self.read_table(local_path, sheet_name, table_columns, start_row)
+                    print(f"   ✅ 成功读取 {len(df)} 行数据{'（复用已解析结果）' if from_cache else ''}")
 
                 except requests.exceptions.RequestException as e:
                     raise ConnectionError(
@@ -225,34 +520,438 @@ class ExcelSKULoader:
                         f"3. 如果是完整路径，确保路径正确"
                     )
 
-                df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-                print(f"   ✅ 成功读取 {len(df)} 行数据")
+                table_path = file_path
+                df, from_cache = self.read_table(file_path, sheet_name, table_columns, start_row)
+                if from_cache:
+                    print(f"   ♻️ 文件未修改，复用已解析的 {len(df)} 行数据")
+                else:
+                    print(f"   ✅ 成功读取 {len(df)} 行数据")
             
-            # 2. 解析SKU分组
-            print(f"\n🔍 解析SKU分组数据...")
-            groups = self.parse_sku_groups(
-                df, combined_sku_col, sku_col, pcs_col, 
-                url_col, start_row, filter_combined_sku
-            )
+            # 2. 解析SKU分组（有过滤条件时借助组合SKU行索引只处理匹配的行）
+            row_index = None
+            if SkuFilter(filter_combined_sku).active:
+                row_index = self.get_row_index(table_path, sheet_name, combined_sku_col, start_row, df)
+            print("\n🔍 解析SKU分组数据...")
+            with self._metrics.stage('parse'):
+                groups = self.parse_sku_groups(
+                    df, combined_sku_col, sku_col, pcs_col, 
+                    url_col, start_row, filter_combined_sku,
+                    shard_index, shard_count, shard_mode, row_index
+                )
+            self._metrics.set('parse', 'groups', len(groups))
+            self._metrics.set('parse', 'items', groups.item_count)
             
             if not groups:
+                if self._shard is not None:
+                    print(f"⚠️ 当前分片没有分配到组合SKU ({self._shard.report_line()})")
+                    return self.create_empty_result("当前分片没有分配到组合SKU")
                 print("⚠️ 未找到有效的SKU分组数据")
                 return self.create_empty_result()
             
             print(f"   ✅ 找到 {len(groups)} 个组合SKU")
+            if self._shard is not None:
+                print(f"   🧩 {self._shard.report_line()}")
+
+            # 分页：只处理 [group_offset, group_offset + group_limit) 窗口内的组合SKU
+            if group_offset > 0 or group_limit > 0:
+                groups = self.paginate_groups(groups, group_offset, group_limit)
+                if not groups:
+                    print("⚠️ 分页窗口内没有组合SKU")
+                    return self.create_empty_result(f"分页偏移 {group_offset} 超出范围")
+
+            # 增量重新执行：图片未变化的分组直接复用上次的批次张量，只构建新增/变化的分组
+            downloader = self._active_downloader = self.get_downloader(download_workers, per_host_limit,
+                                                                       download_retries)
+            if output_mode == "by_combined_sku":
+                self._reused_batches = self.match_cached_batches(groups, batch_cache_mb, use_cache,
+                                                                 downloader)
+            pending_groups = groups.exclude(self._reused_batches)
+
+            # 每个唯一图片在本次运行中只下载/解码一次，多个分组共享同一数组
+            self._plan = RunImagePlan.from_groups(pending_groups, self.image_cache_key)
+            print(f"   🔗 {self._plan.report_line()}")
+
+            # 3. 下载：流水线模式下随分组逐步下载（提前 pipeline_depth 个分组），
+            #    pipeline_depth 为 0 时先并发预下载窗口内的所有图片
+            if pipeline_depth > 0:
+                print(f"\n🌐 流水线下载+解码: 提前 {pipeline_depth} 个分组 "
+                      f"(线程: {downloader.max_workers}, 单主机: {downloader.per_host_limit}, "
+                      f"重试: {downloader.retries})")
+            else:
+                self.prefetch_images(pending_groups, use_cache, self._active_disk_cache, download_workers,
+                                     per_host_limit, download_retries)
             
-            # 3. 按输出模式处理
+            # 4. 按输出模式处理
             if output_mode == "by_combined_sku":
                 return self.process_by_combined_sku(groups, use_cache, label_format, filename_prefix)
             else:
-                return self.process_all_in_one(groups, use_cache, label_format, filename_prefix)
+                return self.process_all_in_one(groups, use_cache, label_format, filename_prefix,
+                                               bucket_count, canvas_size)
             
         except Exception as e:
             error_msg = f"加载失败: {str(e)}"
             print(f"\n❌ {error_msg}")
             import traceback
             traceback.print_exc()
+            self._next_group_offset = -1
             return self.create_empty_result(error_msg)
+        finally:
+            self._prefetched = {}
+            self._plan = None
+
+    def read_table(self, path, sheet_name, columns, start_row):
+        """
+        读取工作表投影列并记录 excel_read 阶段指标
+        Excel 工作簿有最新的 Parquet 副本时读取副本；开启 parquet_sidecar 时先生成缺失的副本
+        """
+        metrics = self.run_metrics()
+        with metrics.stage('excel_read'):
+            df, from_cache = load_table(path, sheet_name, columns, start_row,
+                                        sidecars=sidecars, build_sidecar=self._parquet_sidecar)
+        metrics.set('excel_read', 'format', detect_format(path))
+        metrics.set('excel_read', 'rows', len(df))
+        metrics.set('excel_read', 'cached', from_cache)
+        return df, from_cache
+
+    def get_row_index(self, table_path, sheet_name, combined_col, start_row, df):
+        """获取工作簿当前版本的组合SKU行索引并记录 index 阶段指标"""
+        metrics = self.run_metrics()
+        with metrics.stage('index'):
+            index, source = row_indexes.get(table_path, sheet_name,
+                                            column_letter_to_index(combined_col, 0), start_row, df)
+        metrics.set('index', 'source', source)
+        metrics.set('index', 'groups', len(index.names))
+        print(f"   🗂️ 组合SKU索引: {len(index.names)} 个组合SKU, {len(index.starts)} 个行区间"
+              f" ({'新建' if source == 'built' else '复用'})")
+        return index
+
+    def paginate_groups(self, groups, group_offset, group_limit):
+        """
+        截取分页窗口，并记录下一页的起始偏移（处理完最后一页时为 -1）
+        group_limit 为 0 表示从 group_offset 处理到末尾
+        """
+        total = len(groups)
+        end = total if group_limit <= 0 else min(group_offset + group_limit, total)
+        page = groups.slice(group_offset, end)
+
+        self._next_group_offset = end if end < total else -1
+        self._page_info = (f"分页: 第 {group_offset + 1}-{end} 个组合SKU / 共 {total} 个, "
+                           f"下一页偏移: {self._next_group_offset}")
+        if page:
+            print(f"   📄 {self._page_info}")
+        return page
+
+    @classmethod
+    def get_downloader(cls, max_workers=None, per_host_limit=4, retries=2):
+        """获取共享下载器（配置变化时重建，保持连接池复用）"""
+        downloader = cls._downloader
+        if max_workers is None:
+            if downloader is not None:
+                return downloader
+            max_workers = 8
+        if downloader is None or downloader.config_key() != (max_workers, per_host_limit, retries):
+            if downloader is not None:
+                downloader.close()
+            downloader = ImageDownloader(max_workers=max_workers,
+                                         per_host_limit=per_host_limit,
+                                         retries=retries,
+                                         failures=cls._failure_cache,
+                                         breaker=cls._host_breaker)
+            cls._downloader = downloader
+        return downloader
+
+    @classmethod
+    def get_decode_pool(cls, workers=None, backend="thread"):
+        """获取共享解码池（配置变化时重建）"""
+        pool = ExcelSKULoader._decode_pool
+        if workers is None:
+            if pool is not None:
+                return pool
+            workers = 1
+        if pool is None or pool.config_key() != (workers, backend):
+            if pool is not None:
+                pool.close()
+            pool = DecodePool(workers, backend)
+            ExcelSKULoader._decode_pool = pool
+        return pool
+
+    @classmethod
+    def get_batch_cache(cls, max_mb):
+        """获取共享批次结果缓存，max_mb 为 0 时禁用并释放已缓存的批次"""
+        if max_mb <= 0:
+            if cls._batch_cache is not None:
+                cls._batch_cache.clear()
+            return None
+        if cls._batch_cache is None:
+            cls._batch_cache = BatchResultCache(max_mb * 1024 * 1024)
+        else:
+            cls._batch_cache.resize(max_mb * 1024 * 1024)
+        return cls._batch_cache
+
+    def match_cached_batches(self, groups, batch_cache_mb, use_cache, downloader):
+        """
+        计算每个分组的指纹并查找上次构建的批次
+        有缓存批次的分组先经磁盘缓存重新验证其图片（未过期的条目不发请求，过期的发送条件请求），
+        图片内容与构建时一致才复用；关闭 use_cache 或没有磁盘缓存时不复用也不缓存
+        返回 {组合SKU: 可复用的批次张量}
+        """
+        cache = self.get_batch_cache(batch_cache_mb)
+        if cache is None or not use_cache or self._active_disk_cache is None:
+            return {}
+        candidates = []
+        for combined_sku, group_data in groups.items():
+            fingerprint = group_fingerprint(group_data.urls,
+                                            self._max_side, str(self._output_dtype))
+            self._group_fingerprints[combined_sku] = fingerprint
+            if fingerprint in cache:
+                candidates.append((combined_sku, fingerprint, group_data.urls))
+        if not candidates:
+            return {}
+
+        urls = list(dict.fromkeys(url for _, _, group_urls in candidates for url in group_urls))
+        start = time.perf_counter()
+        results = downloader.fetch_all(urls, cache=self._active_disk_cache)
+        elapsed = time.perf_counter() - start
+        self.run_metrics().add_time('download', elapsed, len(results))
+        with self._stats_lock:
+            self._download_stats['seconds'] += elapsed
+        for url, result in results.items():
+            self.record_download(result)
+            if result.ok:
+                self._image_digests[url] = image_digest(result.content)
+            # 重新构建的分组直接使用本次下载的内容
+            self._prefetched[url] = result
+
+        reused = {}
+        for combined_sku, fingerprint, group_urls in candidates:
+            validator = content_validator(self._image_digests.get(url) for url in group_urls)
+            tensor = cache.get(fingerprint, validator)
+            if tensor is not None:
+                reused[combined_sku] = tensor
+        if reused:
+            print(f"   ♻️ 增量复用: {len(reused)}/{len(groups)} 个组合SKU 图片未变化，直接复用批次")
+        if len(reused) < len(candidates):
+            print(f"   🔄 {len(candidates) - len(reused)} 个组合SKU 的图片已变化，重新构建")
+        return reused
+
+    def group_validator(self, urls):
+        """分组图片内容的校验值：优先用本次运行记录的摘要，否则读取磁盘缓存"""
+        digests = []
+        for url in urls:
+            digest = self._image_digests.get(url)
+            if digest is None and self._active_disk_cache is not None:
+                entry = self._active_disk_cache.get(url)
+                if entry is not None:
+                    digest = image_digest(entry.content)
+            digests.append(digest)
+        return content_validator(digests)
+
+    @staticmethod
+    def image_cache_budget(cache_size, cache_size_mb):
+        """内存图片缓存预算（字节）：cache_size_mb 为 0 时按 cache_size 张数折算，兼容旧工作流"""
+        if cache_size_mb <= 0:
+            cache_size_mb = cache_size * LEGACY_IMAGE_CACHE_MB
+        return cache_size_mb * 1024 * 1024
+
+    @classmethod
+    def get_disk_cache(cls, max_mb):
+        """获取共享磁盘缓存，max_mb 为 0 时禁用"""
+        if max_mb <= 0:
+            return None
+        if cls._disk_cache is None:
+            cls._disk_cache = DiskImageCache(image_cache_folder, max_mb * 1024 * 1024)
+        else:
+            cls._disk_cache.max_bytes = max_mb * 1024 * 1024
+        return cls._disk_cache
+
+    def prefetch_images(self, groups, use_cache, disk_cache, max_workers, per_host_limit, retries):
+        """在处理分组前并发下载所有引用的图片，结果（含失败）暂存到本次运行"""
+        urls = [url for url in groups.unique_urls() if url not in self._prefetched
+                and not (use_cache and self.image_cache_key(url) in self._image_cache)]
+        if not urls:
+            return
+
+        downloader = self.get_downloader(max_workers, per_host_limit, retries)
+        print(f"\n🌐 并发下载 {len(urls)} 张图片 "
+              f"(线程: {downloader.max_workers}, 单主机: {downloader.per_host_limit}, "
+              f"重试: {downloader.retries})")
+
+        start = time.perf_counter()
+        results = downloader.fetch_all(urls, cache=disk_cache)
+        elapsed = time.perf_counter() - start
+        stats = self._download_stats
+        stats['seconds'] += elapsed
+        self.run_metrics().add_time('download', elapsed, len(results))
+
+        for url, result in results.items():
+            self._prefetched[url] = result
+            self.record_download(result)
+            if not result.ok:
+                logger.debug("下载失败: %s (%s)", url[:80], result.error)
+
+        print(f"   ✅ 下载完成: 网络 {stats['fetched']}, 磁盘缓存 {stats['disk_hits']}, "
+              f"304验证 {stats['revalidated']}, 失败 {stats['failed']}, "
+              f"{stats['bytes'] / 1024 / 1024:.1f} MB, 用时 {stats['seconds']:.1f}s")
+
+    def record_download(self, result):
+        """按来源累计下载统计（流水线线程并发调用）"""
+        with self._stats_lock:
+            self._record_download(result)
+        self.run_metrics().record_download(result)
+
+    def _record_download(self, result):
+        stats = self._download_stats
+        if not result.ok:
+            stats['failed'] += 1
+            if result.source == DownloadResult.SOURCE_SKIPPED:
+                stats['skipped'] += 1
+            self._failed_urls[result.url] = (result.error_class or 'unknown', result.error)
+        elif result.source == DownloadResult.SOURCE_DISK:
+            stats['disk_hits'] += 1
+        elif result.source == DownloadResult.SOURCE_REVALIDATED:
+            stats['revalidated'] += 1
+        else:
+            stats['fetched'] += 1
+            stats['bytes'] += len(result.content)
+
+    def download_report_lines(self):
+        """生成缓存与下载统计报告行"""
+        stats = self._download_stats
+        cache_stats = self._image_cache.stats()
+        lookups = self._cache_hits + self._cache_misses
+        return [
+            f"内存缓存: {cache_stats['entries']} 张, "
+            f"{cache_stats['bytes'] / 1024 / 1024:.1f}/{cache_stats['max_bytes'] / 1024 / 1024:.0f} MB",
+            f"内存缓存累计: 命中 {cache_stats['hits']}, 未命中 {cache_stats['misses']}, "
+            f"淘汰 {cache_stats['evictions']}",
+            f"内存缓存本次: 命中 {self._cache_hits} 次, 未命中 {self._cache_misses} 次"
+            + (f", 命中率 {self._cache_hits / lookups * 100:.1f}%" if lookups else ""),
+            f"磁盘缓存命中: {stats['disk_hits']} 次 (304验证: {stats['revalidated']} 次)",
+            f"网络下载: {stats['fetched']} 次, 失败: {stats['failed']} 次"
+            + (f" (其中 {stats['skipped']} 次为近期失败/主机熔断，直接跳过)" if stats['skipped'] else ""),
+            f"下载数据量: {stats['bytes'] / 1024 / 1024:.1f} MB",
+            f"下载用时: {stats['seconds']:.1f}s",
+            *([self._plan.report_line()] if self._plan is not None else []),
+        ]
+
+    def record_failure(self, url, error_class, error):
+        """记录下载之后的失败（如解码失败），同时写入负缓存"""
+        with self._stats_lock:
+            self._failed_urls[url] = (error_class, error)
+        self._failure_cache.record(url, error_class, error)
+
+    def failure_report_lines(self, groups):
+        """
+        失败图片明细：按错误类别汇总，并列出每个 URL 及引用它的组合SKU/SKU，便于修正数据
+        """
+        if not self._failed_urls:
+            return []
+        refs = groups.url_references(self._failed_urls)
+        by_class = Counter(error_class for error_class, _ in self._failed_urls.values())
+        lines = ["失败图片: " + ", ".join(f"{name} {count}" for name, count in by_class.most_common())]
+        for url, (error_class, error) in islice(self._failed_urls.items(), MAX_REPORTED_FAILURES):
+            where = refs.get(url, [])
+            location = where[0] + (f" 等 {len(where)} 处" if len(where) > 1 else "") if where else "-"
+            lines.append(f"  [{error_class}] {location}: {url}")
+        if len(self._failed_urls) > MAX_REPORTED_FAILURES:
+            lines.append(f"  ... 另有 {len(self._failed_urls) - MAX_REPORTED_FAILURES} 个")
+        open_hosts = self._host_breaker.open_hosts()
+        if open_hosts:
+            lines.append("熔断主机: " + ", ".join(f"{host} (连续失败 {count} 次)"
+                                                   for host, count in open_hosts.items()))
+        return lines
+
+    def run_metrics(self):
+        """本次运行的指标（在 load_sku_data 之外单独调用加载方法时临时创建）"""
+        if self._metrics is None:
+            self._metrics = RunMetrics()
+        return self._metrics
+
+    def metrics_json(self, **info):
+        """汇总本次运行的指标为 JSON 字符串（metrics_json 输出）"""
+        metrics = self._metrics
+        if metrics is None:
+            return "{}"
+        stats = self._download_stats
+        metrics.info.update(info)
+        metrics.info['batch_bytes'] = self._batch_bytes
+        metrics.info['output_precision'] = str(self._output_dtype).replace('torch.', '')
+        metrics.info['spilled'] = {'bytes': self._spilled_bytes, 'batches': self._spilled_batches}
+        metrics.info['memory_cache'] = {'hits': self._cache_hits, 'misses': self._cache_misses}
+        if self._plan is not None:
+            metrics.info['dedup'] = self._plan.to_dict()
+        metrics.info['reused_groups'] = len(self._reused_batches)
+        if self._failed_urls:
+            metrics.info['failures'] = dict(Counter(error_class for error_class, _
+                                                    in self._failed_urls.values()))
+            metrics.info['failed_urls'] = [
+                {'url': url, 'class': error_class, 'error': error}
+                for url, (error_class, error) in islice(self._failed_urls.items(),
+                                                        MAX_REPORTED_FAILURES)]
+            metrics.info['open_hosts'] = self._host_breaker.open_hosts()
+        for key in ('fetched', 'failed', 'skipped', 'bytes', 'disk_hits', 'revalidated'):
+            metrics.set('download', key, stats[key])
+        if self._shard is None:
+            return metrics.to_json()
+        data = metrics.to_dict()
+        data['shard'] = self.write_shard_manifest(data)
+        return json.dumps(data, ensure_ascii=False)
+
+    def write_shard_manifest(self, data):
+        """生成并写入当前分片的清单（数量与耗时取自本次运行指标），返回清单"""
+        shard = self._shard
+        manifest = shard.manifest(
+            group_offset=self._group_offset,
+            next_group_offset=self._next_group_offset,
+            batches=data.get('batches', 0),
+            images=data.get('images', 0),
+            failed_downloads=self._download_stats['failed'],
+            error=data.get('error'),
+            total_seconds=data['total_seconds'],
+            stage_seconds={name: stage['seconds'] for name, stage in data['stages'].items()},
+        )
+        try:
+            path = shard.write_manifest(shard_manifest_folder, manifest, self._group_offset)
+            print(f"   🧩 分片清单: {path}")
+        except OSError as e:
+            print(f"   ⚠️ 分片清单写入失败: {e}")
+        return manifest
+
+    def assemble_batch(self, images, height, width):
+        """
+        预分配批次并在线程池中并行缩放写入各槽位（槽位互不重叠，Pillow/NumPy 释放 GIL）
+        本次运行的内存中批次超出 memory_budget_mb 时，新批次分配在磁盘内存映射文件中
+        """
+        start = time.perf_counter()
+        nbytes = batch_nbytes(len(images), height, width, self._output_dtype)
+        spill_path = None
+        resident = self._batch_bytes - self._spilled_bytes
+        if self._memory_budget and resident + nbytes > self._memory_budget:
+            os.makedirs(spill_folder, exist_ok=True)
+            spill_path = os.path.join(spill_folder, f"{uuid.uuid4().hex}.bin")
+        assembler = BatchAssembler(len(images), height, width,
+                                   reducing_gap=REDUCING_GAP if self._max_side else None,
+                                   dtype=self._output_dtype, spill_path=spill_path)
+        pool = self._decode_pool or self.get_decode_pool()
+        pool.map(assembler.add, range(len(images)), images)
+        metrics = self.run_metrics()
+        metrics.add_time('assembly', time.perf_counter() - start)
+        metrics.add_time('resize', sum(assembler.resize_seconds),
+                         sum(1 for seconds in assembler.resize_seconds if seconds))
+        self._batch_bytes += assembler.nbytes
+        if assembler.spilled:
+            self._spilled_bytes += assembler.nbytes
+            self._spilled_batches += 1
+        return assembler
+
+    def batch_memory_line(self):
+        """报告中的批次内存行（含溢出到磁盘的部分）"""
+        line = (f"批次张量内存: {self._batch_bytes / 1024 / 1024:.1f} MB "
+                f"({str(self._output_dtype).replace('torch.', '')})")
+        if self._spilled_batches:
+            line += (f", 其中 {self._spilled_batches} 个批次 "
+                     f"{self._spilled_bytes / 1024 / 1024:.1f} MB 溢出到磁盘映射文件")
+        return line
     
     def format_filename_prefix(self, prefix):
         """处理文件名前缀中的日期格式"""
@@ -276,72 +975,72 @@ class ExcelSKULoader:
         # 处理日期格式
         processed_prefix = self.format_filename_prefix(filename_prefix)
         
-        for idx, (combined_sku, group_data) in enumerate(groups.items(), 1):
-            print(f"\n{'='*80}")
-            print(f"🎯 [{idx}/{len(groups)}] 处理组合SKU: {combined_sku}")
-            print(f"{'='*80}")
-            print(f"   子SKU数量: {len(group_data['items'])}")
+        for idx, ((combined_sku, group_data), images) in enumerate(
+                self.iter_group_images(groups, use_cache), 1):
+            logger.debug("[%d/%d] 处理组合SKU: %s (子SKU数量: %d)",
+                         idx, len(groups), combined_sku, len(group_data))
             
-            batch_images = []
             batch_labels = []
+            full_filename = f"{processed_prefix}{combined_sku}"
+            
+            # 图片未变化：直接复用上次构建的批次（标签按本次的 PCS 重新生成）
+            reused = self._reused_batches.get(combined_sku)
+            if reused is not None:
+                batch_labels = [label_format.format(pcs=pcs) for pcs in group_data.pcs]
+                all_image_batches.append(reused)
+                all_label_batches.append(",".join(batch_labels))
+                all_combined_skus.append(full_filename)
+                self._batch_bytes += reused.element_size() * reused.nelement()
+                info_lines.append(f"♻️ {combined_sku}: {len(batch_labels)} 个SKU (复用)")
+                logger.debug("   未变化，复用上次的批次")
+                continue
             
             # ===== 第一步：先收集所有图片，找出最大尺寸 =====
             temp_images = []
-            for item in group_data['items']:
-                print(f"\n   📦 处理SKU: {item['sku']}")
-                print(f"      PCS数: {item['pcs']}")
-                print(f"      URL: {item['url'][:80]}...")
-                
-                img = self.download_image(item['url'], use_cache=use_cache)
-                
-                if img:
-                    temp_images.append((img, item))
-                    print(f"      ✅ 加载成功 ({img.size[0]}x{img.size[1]})")
+            for sku, pcs, url, img in zip(group_data.skus, group_data.pcs, group_data.urls, images):
+                if img is not None:
+                    temp_images.append((img, pcs))
+                    logger.debug("   SKU %s PCS:%s %dx%d %s", sku, pcs,
+                                 img.shape[1], img.shape[0], url[:80])
                 else:
-                    print(f"      ❌ 加载失败")
+                    logger.debug("   SKU %s PCS:%s 加载失败 %s", sku, pcs, url[:80])
             
             if not temp_images:
                 info_lines.append(f"❌ {combined_sku}: 0 个SKU (失败)")
-                print(f"\n   ❌ 批次失败")
+                logger.warning("组合SKU %s 批次失败：没有可用图片", combined_sku)
                 continue
             
             # ===== 第二步：找出最大尺寸 =====
-            max_width = max(img.size[0] for img, _ in temp_images)
-            max_height = max(img.size[1] for img, _ in temp_images)
-            print(f"\n   📏 统一尺寸: {max_width}x{max_height}")
+            max_width = max(img.shape[1] for img, _ in temp_images)
+            max_height = max(img.shape[0] for img, _ in temp_images)
+            if self._max_side:
+                max_width = min(max_width, self._max_side)
+                max_height = min(max_height, self._max_side)
+            logger.debug("   统一尺寸: %dx%d", max_width, max_height)
             
-            # ===== 第三步：调整所有图片到统一尺寸 =====
-            for img, item in temp_images:
-                # 调整图片尺寸
-                img_resized = self.resize_and_pad(img, max_width, max_height)
-                
-                # 转换为numpy数组
-                img_array = np.array(img_resized).astype(np.float32) / 255.0
-                if len(img_array.shape) == 2:  # 灰度图
-                    img_array = np.stack([img_array] * 3, axis=-1)
-                elif img_array.shape[-1] == 4:  # RGBA
-                    img_array = img_array[:, :, :3]
-                
-                batch_images.append(img_array)
-                
+            # ===== 第三步：预分配批次张量，逐张缩放并写入槽位 =====
+            assembler = self.assemble_batch([img for img, _ in temp_images], max_height, max_width)
+            for img, pcs in temp_images:
                 # 生成标签
-                label = label_format.format(pcs=item['pcs'])
+                label = label_format.format(pcs=pcs)
                 batch_labels.append(label)
             
-            # ===== 第四步：堆叠为批次 =====
-            batch_tensor = torch.from_numpy(np.stack(batch_images))
+            # ===== 第四步：批次张量已就绪 =====
+            batch_tensor = assembler.tensor
             all_image_batches.append(batch_tensor)
+            # 全部图片加载成功的批次才缓存（连同图片内容校验值），有失败的分组下次重新尝试
+            fingerprint = self._group_fingerprints.get(combined_sku)
+            if fingerprint and len(temp_images) == len(group_data):
+                self._batch_cache.put(fingerprint, batch_tensor, self.group_validator(group_data.urls))
 
             labels_str = ",".join(batch_labels)
             all_label_batches.append(labels_str)
 
-            # 生成完整的文件名前缀（包含路径和combined_sku）
-            full_filename = f"{processed_prefix}{combined_sku}"
+            # 完整的文件名前缀（包含路径和combined_sku）
             all_combined_skus.append(full_filename)
 
-            info_lines.append(f"✅ {combined_sku}: {len(batch_images)} 个SKU")
-            print(f"\n   ✅ 批次完成: {len(batch_images)} 张图片")
-            print(f"      标签: {labels_str}")
+            info_lines.append(f"✅ {combined_sku}: {len(batch_labels)} 个SKU")
+            logger.debug("   批次完成: %d 张图片, 标签: %s", len(batch_labels), labels_str)
         
         if not all_image_batches:
             print("\n❌ 没有成功加载任何图片")
@@ -354,40 +1053,43 @@ class ExcelSKULoader:
             "📊 Excel SKU 加载报告（按组合SKU分批）",
             "="*60,
             f"组合SKU数量: {len(groups)}",
-            f"批次数量: {len(all_image_batches)}",
+            *([self._page_info] if self._page_info else []),
+            f"批次数量: {len(all_image_batches)}"
+            + (f" (复用未变化的 {len(self._reused_batches)} 个)" if self._reused_batches else ""),
             f"图片总数: {total_images}",
+            self.batch_memory_line(),
             "="*60,
             "",
             *info_lines,
             "",
             "="*60,
-            f"缓存命中: {self._cache_hits} 次",
-            f"缓存未命中: {self._cache_misses} 次",
-            f"缓存命中率: {self._cache_hits/(self._cache_hits+self._cache_misses)*100:.1f}%" if (self._cache_hits+self._cache_misses) > 0 else "N/A",
+            *self.download_report_lines(),
+            *self.failure_report_lines(groups),
             "="*60
         ])
         
         print("\n" + "="*80)
         print(f"🎉 加载完成! 共 {len(all_image_batches)} 个批次，{total_images} 张图片")
         for i, labels in enumerate(all_label_batches):
-            print(f"   批次{i+1}: {labels}")
+            logger.debug("   批次%d: %s", i + 1, labels)
         print("="*80 + "\n")
 
-        return (all_image_batches, all_label_batches, info_str, all_combined_skus)
+        return (all_image_batches, all_label_batches, info_str, all_combined_skus,
+                self._next_group_offset,
+                self.metrics_json(batches=len(all_image_batches), images=total_images))
 
     def resize_and_pad(self, img, target_width, target_height):
         """
         调整图片尺寸并居中填充
         保持宽高比，不足部分用白色填充
+        img 可以是 PIL 图片或 uint8 数组
         """
-        # 计算缩放比例
-        width_ratio = target_width / img.size[0]
-        height_ratio = target_height / img.size[1]
-        scale_ratio = min(width_ratio, height_ratio)
-        
-        # 计算新尺寸
-        new_width = int(img.size[0] * scale_ratio)
-        new_height = int(img.size[1] * scale_ratio)
+        if isinstance(img, np.ndarray):
+            img = Image.fromarray(img)
+
+        # 计算缩放后尺寸和居中位置
+        new_width, new_height, x, y = fit_within(img.size[0], img.size[1],
+                                                 target_width, target_height)
         
         # 缩放图片
         img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
@@ -395,197 +1097,354 @@ class ExcelSKULoader:
         # 创建白色背景
         result = Image.new('RGB', (target_width, target_height), (255, 255, 255))
         
-        # 计算居中位置
-        x = (target_width - new_width) // 2
-        y = (target_height - new_height) // 2
-        
         # 粘贴图片
         result.paste(img_resized, (x, y))
 
         return result
     
-    def process_all_in_one(self, groups, use_cache, label_format, filename_prefix):
-        """所有图片合并为一个批次"""
+    def process_all_in_one(self, groups, use_cache, label_format, filename_prefix,
+                           bucket_count=4, canvas_size=0):
+        """
+        所有图片合并输出
+        尺寸不一的图片按宽高比/尺寸分桶，每个桶一个预分配批次；
+        canvas_size > 0 时所有图片统一缩放到 canvas_size x canvas_size 的单个批次
+        """
 
-        all_images = []
-        all_labels = []
+        entries = []  # (图片, PCS)
         info_lines = []
 
         # 处理日期格式
         processed_prefix = self.format_filename_prefix(filename_prefix)
         
-        for idx, (combined_sku, group_data) in enumerate(groups.items(), 1):
-            print(f"\n🎯 [{idx}/{len(groups)}] 处理组合SKU: {combined_sku}")
+        for idx, ((combined_sku, group_data), images) in enumerate(
+                self.iter_group_images(groups, use_cache), 1):
+            logger.debug("[%d/%d] 处理组合SKU: %s", idx, len(groups), combined_sku)
             
-            for item in group_data['items']:
-                print(f"   📦 {item['sku']} (PCS:{item['pcs']})")
-                
-                img = self.download_image(item['url'], use_cache=use_cache)
+            for sku, pcs, img in zip(group_data.skus, group_data.pcs, images):
+                logger.debug("   SKU %s (PCS:%s)%s", sku, pcs,
+                             '' if img is not None else ' 加载失败')
                 
-                if img:
-                    img_array = np.array(img).astype(np.float32) / 255.0
-                    if len(img_array.shape) == 2:
-                        img_array = np.stack([img_array] * 3, axis=-1)
-                    elif img_array.shape[-1] == 4:
-                        img_array = img_array[:, :, :3]
-                    
-                    all_images.append(img_array)
-                    all_labels.append(label_format.format(pcs=item['pcs']))
+                if img is not None:
+                    entries.append((img, pcs))
             
-            info_lines.append(f"{combined_sku}: {len(group_data['items'])} 个SKU")
+            info_lines.append(f"{combined_sku}: {len(group_data)} 个SKU")
         
-        if not all_images:
+        if not entries:
             return self.create_empty_result()
 
-        images_tensor = torch.from_numpy(np.stack(all_images))
-        labels_str = ",".join(all_labels)
+        sizes = [(img.shape[1], img.shape[0]) for img, _ in entries]
+        if canvas_size > 0:
+            buckets = [list(range(len(entries)))]
+        else:
+            buckets = plan_size_buckets(sizes, bucket_count)
 
-        # all_in_one模式下，使用所有combined_sku合并命名
-        combined_sku_str = "_".join(list(groups.keys()))
-        full_filename = f"{processed_prefix}{combined_sku_str}"
+        # all_in_one模式下，使用所有combined_sku合并命名；多个桶时追加桶序号
+        combined_sku_str = "_".join(groups.keys())
+        
+        image_batches = []
+        label_batches = []
+        filenames = []
+        bucket_lines = []
+        total_canvas = 0
+        total_padding = 0.0
+        for bucket_idx, members in enumerate(buckets, 1):
+            member_sizes = [sizes[i] for i in members]
+            if canvas_size > 0:
+                width = height = canvas_size
+            else:
+                width, height = canvas_for(member_sizes, self._max_side)
+            
+            assembler = self.assemble_batch([entries[i][0] for i in members], height, width)
+            
+            image_batches.append(assembler.tensor)
+            label_batches.append(",".join(label_format.format(pcs=entries[i][1])
+                                          for i in members))
+            suffix = f"_{bucket_idx}" if len(buckets) > 1 else ""
+            filenames.append(f"{processed_prefix}{combined_sku_str}{suffix}")
+            
+            padding = padding_ratio(member_sizes, width, height)
+            canvas_pixels = len(members) * width * height
+            total_canvas += canvas_pixels
+            total_padding += padding * canvas_pixels
+            bucket_lines.append(f"桶{bucket_idx}: {len(members)} 张, {width}x{height}, "
+                                f"填充 {padding * 100:.1f}%, {assembler.nbytes / 1024 / 1024:.1f} MB")
+            print(f"   🪣 {bucket_lines[-1]}")
 
         info_str = "\n".join([
             "="*60,
             "📊 Excel SKU 加载报告（全部合并）",
             "="*60,
             f"组合SKU数量: {len(groups)}",
-            f"图片总数: {len(all_images)}",
+            *([self._page_info] if self._page_info else []),
+            f"图片总数: {len(entries)}",
+            f"尺寸分桶: {len(buckets)} 个"
+            + (f" (统一画布 {canvas_size}x{canvas_size})" if canvas_size > 0 else ""),
+            f"填充开销: {total_padding / total_canvas * 100:.1f}%",
+            self.batch_memory_line(),
+            *bucket_lines,
             "="*60,
             "",
             *info_lines,
             "",
+            "="*60,
+            *self.download_report_lines(),
+            *self.failure_report_lines(groups),
             "="*60
         ])
 
-        return ([images_tensor], [labels_str], info_str, [full_filename])
+        return (image_batches, label_batches, info_str, filenames,
+                self._next_group_offset,
+                self.metrics_json(batches=len(image_batches), images=len(entries)))
     
     def parse_sku_groups(self, df, combined_col, sku_col, pcs_col, url_col, 
-                        start_row, filter_sku=""):
-        """解析Excel数据并按组合SKU分组（支持空值继承）"""
-        groups = OrderedDict()  # 使用有序字典保持顺序
-        
-        col_map = {
-            'A': 0, 'B': 1, 'C': 2, 'D': 3, 'E': 4, 'F': 5,
-            'G': 6, 'H': 7, 'I': 8, 'J': 9, 'K': 10, 'L': 11,
-            'M': 12, 'N': 13, 'O': 14, 'P': 15, 'Q': 16, 'R': 17
-        }
+                        start_row, filter_sku="", shard_index=0, shard_count=1, shard_mode="hash",
+                        row_index=None):
+        """
+        解析Excel数据并按组合SKU分组（支持空值继承）
+        按列向量化处理：组合SKU列前向填充，过滤/SKU/URL 有效性均为布尔掩码
+        df 的列名为 0 基列号、索引为 0 基行号（可以是只含所需列的投影表）
+        返回列式的 SkuGroups（不为每行创建字典）
+        filter_sku 支持多值/前缀/正则（见 SkuFilter）；给出 row_index 时只取匹配分组所在的行
+        shard_count > 1 时只保留分配给 shard_index 的组合SKU，划分结果记录在 self._shard；
+        shard_index 超出 0~shard_count-1 时抛出 ValueError（shard_count 为 1 时同样检查）
+        """
+        shard_error = shard_range_error(shard_index, shard_count)
+        if shard_error:
+            raise ValueError(shard_error)
+        combined_idx = column_letter_to_index(combined_col, 0)
+        sku_idx = column_letter_to_index(sku_col, 1)
+        pcs_idx = column_letter_to_index(pcs_col, 2)
+        url_idx = column_letter_to_index(url_col, 3)
         
-        combined_idx = col_map.get(combined_col.upper(), 0)
-        sku_idx = col_map.get(sku_col.upper(), 1)
-        pcs_idx = col_map.get(pcs_col.upper(), 2)
-        url_idx = col_map.get(url_col.upper(), 3)
+        data = df[df.index >= max(start_row - 1, 0)]
+        sku_filter = SkuFilter(filter_sku)
         
-        parsed_count = 0
-        skipped_count = 0
-        current_combined_sku = None
+        # 索引中每个区间都从写有组合SKU的行开始，只取这些行时空值继承结果不变
+        if sku_filter.active and row_index is not None and len(data):
+            matched = sku_filter.select(row_index.names)
+            positions = row_index.rows_for(matched) - data.index[0]
+            positions = positions[(positions >= 0) & (positions < len(data))]
+            data = data.iloc[positions]
+            print(f"   🔎 过滤 ({sku_filter.describe()}): 匹配 {len(matched)} 个组合SKU, {len(data)} 行")
+            missing = sku_filter.unmatched(matched)
+            if missing:
+                print(f"   ⚠️ 未找到 {len(missing)} 个组合SKU: {', '.join(missing[:20])}"
+                      + (" ..." if len(missing) > 20 else ""))
+        row_numbers = data.index.to_numpy() + 1
         
-        for idx in range(start_row - 1, len(df)):
-            row = df.iloc[idx]
-            
-            # 读取组合SKU（支持空值继承上一行）
-            if combined_idx < len(row):
-                combined_sku_value = row.iloc[combined_idx]
-                
-                if pd.isna(combined_sku_value) or str(combined_sku_value).strip() in ['', 'nan']:
-                    if current_combined_sku:
-                        combined_sku = current_combined_sku
-                    else:
-                        skipped_count += 1
-                        continue
-                else:
-                    combined_sku = str(combined_sku_value).strip()
-                    current_combined_sku = combined_sku
-            else:
-                skipped_count += 1
-                continue
-            
-            # 过滤
-            if filter_sku and filter_sku.strip() != "" and combined_sku != filter_sku.strip():
-                skipped_count += 1
-                continue
-            
-            # 初始化组合SKU
-            if combined_sku not in groups:
-                groups[combined_sku] = {'items': []}
-            
-            # 读取SKU
-            sku = str(row.iloc[sku_idx]).strip() if sku_idx < len(row) else ""
-            if not sku or sku == 'nan':
-                skipped_count += 1
-                continue
-            
-            # 读取PCS数
-            try:
-                pcs_value = row.iloc[pcs_idx] if pcs_idx < len(row) else 1
-                pcs = int(pcs_value) if not pd.isna(pcs_value) else 1
-                if pcs <= 0:
-                    pcs = 1
-            except (ValueError, TypeError):
-                pcs = 1
-            
-            # 读取URL
-            url = str(row.iloc[url_idx]).strip() if url_idx < len(row) else ""
-            if not url or url == 'nan' or not url.startswith('http'):
-                print(f"      ⚠️ 行{idx+1} 跳过无效URL: {sku}")
-                skipped_count += 1
-                continue
-            
-            # 添加到分组
-            groups[combined_sku]['items'].append({
-                'sku': sku,
-                'pcs': pcs,
-                'url': url
-            })
-            parsed_count += 1
+        if combined_idx not in data.columns or len(data) == 0:
+            print("   解析成功: 0 条")
+            print(f"   跳过: {len(data)} 条")
+            return SkuGroups.empty()
+        
+        # 组合SKU：空值继承上一行
+        combined = fill_combined(data[combined_idx])
+        
+        # 过滤：没有组合SKU的行、不满足过滤条件的行
+        kept = combined.notna().to_numpy()
+        if sku_filter.active:
+            matched = sku_filter.select(combined[kept].unique().tolist())
+            kept = kept & combined.isin(matched).to_numpy()
+        kept_pos = np.flatnonzero(kept)
+        # 每行所属分组编号（按组合SKU首次出现的顺序）
+        group_codes, group_names = pd.factorize(combined.to_numpy()[kept_pos])
+        group_names = group_names.tolist()
+        
+        # SKU / URL 有效性掩码（只计算通过过滤的行）
+        skus = self._column_strings(data, sku_idx, kept_pos)
+        urls = self._column_strings(data, url_idx, kept_pos)
+        sku_valid = (skus != '') & (skus != 'nan')
+        url_valid = (urls != '') & (urls != 'nan') & np.char.startswith(urls.astype(str), 'http')
+        valid = sku_valid & url_valid
+        
+        # 分片：按整份（过滤后）工作簿划分，当前实例只保留自己分片的分组和行
+        if shard_count > 1:
+            item_counts = np.bincount(group_codes[valid], minlength=len(group_names))
+            self._shard = ShardAssignment(group_names, item_counts.tolist(),
+                                          shard_index, shard_count, shard_mode)
+            members = set(self._shard.groups)
+            in_shard = np.array([name in members for name in group_names], dtype=bool)
+            # 分片内的分组重新编号（保持原顺序）
+            remap = np.cumsum(in_shard) - 1
+            group_names = self._shard.groups
+            in_shard_rows = in_shard[group_codes]
+            valid = valid & in_shard_rows
+            sku_valid = sku_valid & in_shard_rows
+            group_codes = remap[group_codes]
+        
+        for pos in np.flatnonzero(sku_valid & ~url_valid):
+            logger.debug("行%d 跳过无效URL: %s", row_numbers[kept_pos[pos]], skus[pos])
+        
+        # 通过过滤的组合SKU都会建立分组（即使其下没有有效行）
+        valid_pos = np.flatnonzero(valid)
+        groups = SkuGroups.from_columns(group_names, group_codes[valid_pos], skus[valid_pos],
+                                        self._column_pcs(data, pcs_idx, kept_pos[valid_pos]),
+                                        urls[valid_pos])
+        
+        parsed_count = len(valid_pos)
+        skipped_count = len(data) - parsed_count
         
         print(f"   解析成功: {parsed_count} 条")
         print(f"   跳过: {skipped_count} 条")
         
         return groups
     
+    @staticmethod
+    def _column_strings(data, col_idx, positions):
+        """取出指定行的列值并转为去除首尾空白的字符串数组（缺失列视为空字符串）"""
+        if col_idx not in data.columns or len(positions) == 0:
+            return np.full(len(positions), '', dtype=object)
+        column = data[col_idx].iloc[positions]
+        return column.map(str).str.strip().to_numpy(dtype=object)
+    
+    @staticmethod
+    def _column_pcs(data, col_idx, positions):
+        """
+        解析PCS数为 int32 数组：缺失、非数字或 <=0 时为 1，小数截断取整
+        文本单元格（CSV 的所有单元格）去除首尾空白后按数字解析，布尔值按 1/0 处理
+        """
+        if col_idx not in data.columns:
+            return np.ones(len(positions), dtype=np.int32)
+        column = data[col_idx].iloc[positions]
+        if column.dtype == object:
+            column = column.infer_objects()
+        if not pd.api.types.is_numeric_dtype(column.dtype) or pd.api.types.is_bool_dtype(column.dtype):
+            # 布尔值按 1/0 处理（与 int(True) 一致），其余文本无法解析时为缺失
+            column = column.map(lambda value: int(value) if isinstance(value, (bool, np.bool_)) else value)
+            column = pd.to_numeric(column.map(str).str.strip(), errors='coerce')
+        
+        values = column.to_numpy(dtype=np.float64)
+        pcs = np.ones(len(values), dtype=np.int32)
+        finite = np.isfinite(values)
+        pcs[finite] = np.clip(np.trunc(values[finite]), 1, PCS_MAX).astype(np.int32)
+        return pcs
+    
+    def iter_group_images(self, groups, use_cache=True):
+        """
+        按分组顺序产出 ((组合SKU, 分组数据), 图片列表)
+        后台提前下载+解码后续 pipeline_depth 个分组，当前分组的缩放组装与之重叠；
+        复用已有批次的分组不加载图片（图片列表为 None）
+        """
+        def load_group(entry):
+            if entry[0] in self._reused_batches:
+                return None
+            return self.load_images(entry[1].urls, use_cache)
+
+        return ordered_lookahead(groups.items(), load_group, self._pipeline_depth)
+    
     def download_image(self, url, timeout=30, use_cache=True):
-        """从URL下载图片（带缓存）"""
+        """
+        从URL下载图片（带缓存）
+        返回只读 HxWx3 uint8 数组，缓存命中时直接共享缓存中的数组
+        """
+        return self.load_images([url], use_cache)[0]
+    
+    def load_images(self, urls, use_cache=True):
+        """
+        批量加载图片，返回与 urls 一一对应的只读 uint8 数组列表，失败的位置为 None
+        运行内有去重计划时，每个图片键只加载一次：其他分组（包括流水线中并发的请求）
+        直接共享同一个数组；可在流水线线程中并发调用
+        """
+        keys = [self.image_cache_key(url) for url in urls]
+        url_for = dict(zip(keys, urls))
+        plan = self._plan
+        if plan is None:
+            owned, shared = dict.fromkeys(url_for), {}
+        else:
+            owned, shared = plan.claim(url_for)
         
-        if use_cache and url in self._image_cache:
-            self._cache_hits += 1
-            print(f"      📦 使用缓存")
-            return self._image_cache[url].copy()
+        loaded = {}
+        try:
+            loaded = self._load_unique([url_for[key] for key in owned], use_cache)
+        finally:
+            # 无论成功与否都要完成 Future，避免等待同一图片的其他分组挂起
+            for key, future in owned.items():
+                if future is not None:
+                    future.set_result(loaded.get(url_for[key]))
         
-        self._cache_misses += 1
+        results = {key: loaded.get(url_for[key]) for key in owned}
+        for key, future in shared.items():
+            results[key] = future.result()
+        if plan is not None:
+            for key, count in Counter(keys).items():
+                plan.release(key, count)
+        return [results[key] for key in keys]
+    
+    def _load_unique(self, urls, use_cache=True):
+        """
+        加载一组不重复的图片：先查内存缓存，未命中的取预下载内容（没有则并发下载）后并行解码
+        返回 {url: 只读 uint8 数组或 None}
+        """
+        images = {}
+        pending = []
         
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            print(f"      🌐 下载中...")
-            response = requests.get(url, headers=headers, timeout=timeout, verify=False)
-            response.raise_for_status()
-            
-            img = Image.open(BytesIO(response.content))
-            img_rgb = img.convert('RGB')
-            
-            print(f"      ✅ 下载成功 ({img_rgb.size[0]}x{img_rgb.size[1]})")
-            
+        for url in urls:
             if use_cache:
-                if len(self._image_cache) >= self._cache_max_size:
-                    first_key = next(iter(self._image_cache))
-                    del self._image_cache[first_key]
-                
-                self._image_cache[url] = img_rgb
-            
-            return img_rgb
-            
-        except Exception as e:
-            print(f"      ❌ 失败: {str(e)}")
+                cached = self._image_cache.get(self.image_cache_key(url))
+                if cached is not None:
+                    images[url] = cached
+                    continue
+            pending.append(url)
+        
+        with self._stats_lock:
+            self._cache_hits += len(urls) - len(pending)
+            self._cache_misses += len(pending)
+        if not pending:
+            return images
+        
+        # 没有预下载结果的图片并发下载（共享下载器的线程池与按主机限流）
+        missing = [url for url in pending if url not in self._prefetched]
+        fetched = {}
+        if missing:
+            start = time.perf_counter()
+            downloader = self._active_downloader or self.get_downloader()
+            fetched = downloader.fetch_all(missing, cache=self._active_disk_cache)
+            elapsed = time.perf_counter() - start
+            self.run_metrics().add_time('download', elapsed, len(fetched))
+            for result in fetched.values():
+                self.record_download(result)
+            with self._stats_lock:
+                self._download_stats['seconds'] += elapsed
+        
+        contents = OrderedDict()
+        for url in pending:
+            result = self._prefetched.get(url) or fetched[url]
+            if result.ok:
+                contents[url] = result.content
+                if self._group_fingerprints:
+                    self._image_digests[url] = image_digest(result.content)
+            elif result.source == DownloadResult.SOURCE_SKIPPED:
+                logger.debug("跳过图片: %s (%s)", url[:80], result.error)
+            else:
+                logger.warning("图片下载失败: %s (%s)", url[:80], result.error)
+        
+        pool = self._decode_pool or self.get_decode_pool()
+        with self.run_metrics().stage('decode', len(contents)):
+            decoded_all = pool.decode_all(contents, self._max_side)
+        for url, decoded in decoded_all.items():
+            if isinstance(decoded, Exception):
+                logger.warning("图片解码失败: %s (%s)", url[:80], decoded)
+                self.run_metrics().add('decode', 'failed', 1)
+                self.record_failure(url, 'decode', str(decoded))
+                continue
+            if use_cache:
+                decoded = self._image_cache.put(self.image_cache_key(url), decoded)
+            else:
+                decoded.flags.writeable = False
+            images[url] = decoded
         
-        return None
+        return images
+    
+    def image_cache_key(self, url):
+        """内存缓存键：降采样后的图片与原图分开缓存"""
+        return f"{url}#max={self._max_side}" if self._max_side else url
     
     def create_empty_result(self, message="无数据"):
         """创建空结果"""
         empty_img = np.zeros((512, 512, 3), dtype=np.float32)
         empty_tensor = torch.from_numpy(empty_img).unsqueeze(0)
-        return ([empty_tensor], [""], f"❌ {message}", [""])
+        return ([empty_tensor], [""], f"❌ {message}", [""], self._next_group_offset,
+                self.metrics_json(batches=0, images=0, error=message))
 
 
 # 节点映射
@@ -0,0 +1,47 @@
+"""
+分组流水线
+后台线程提前完成后续分组的下载+解码（I/O 与 CPU 重叠），
+主线程按原顺序取出结果做缩放与批次组装；
+在途分组数不超过 depth，消费端变慢时生产端自动停下（背压），内存有界
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def ordered_lookahead(items, work, depth):
+    """
+    对 items 逐个执行 work，按输入顺序产出 (item, work(item))
+    depth > 0 时最多提前 depth 个条目在后台执行；depth <= 0 时在调用线程中串行执行
+    work 抛出的异常在取到对应条目时重新抛出
+    """
+    items = iter(items)
+    if depth <= 0:
+        for item in items:
+            yield item, work(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=depth, thread_name_prefix='excel_sku_pipeline') as executor:
+        pending = deque()
+
+        def submit_next():
+            for item in items:
+                pending.append((item, executor.submit(work, item)))
+                return True
+            return False
+
+        for _ in range(depth):
+            if not submit_next():
+                break
+
+        try:
+            while pending:
+                item, future = pending.popleft()
+                result = future.result()
+                # 先补充一个后台任务再交出结果，让下一分组的 I/O 与当前分组的组装重叠
+                submit_next()
+                yield item, result
+        finally:
+            # 提前结束（异常或生成器关闭）时丢弃尚未开始的任务
+            for _, future in pending:
+                future.cancel()
@@ -0,0 +1,208 @@
+"""
+缓存预热任务
+在执行工作流之前解析工作簿并把引用的图片下载到磁盘缓存（可选解码进内存缓存），
+任务在后台线程中按块执行，进度可随时查询
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .decode_pool import DecodePool
+from .disk_cache import DiskImageCache
+from .downloader import ImageDownloader
+from .metrics import RunMetrics
+from .sku_filter import SkuFilter
+from .nodes import (ExcelSKULoader, column_letter_to_index, excel_folder, image_cache_folder,
+                    is_true, is_url, remote_workbooks, sidecars)
+from .workbook import load_table
+
+# 每块 URL 数：块内并发下载/解码，块之间更新进度
+CHUNK_SIZE = 64
+# 保留的任务记录数（超出时丢弃最早完成的任务）
+MAX_JOBS = 50
+# 进度中列出的失败 URL 上限
+MAX_FAILED_URLS = 20
+
+
+class PrefetchJob:
+    """单个预热任务的状态（字段在锁内更新，to_dict 返回快照）"""
+
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.params = params
+        self.status = 'queued'
+        self.groups = 0
+        self.total = 0
+        self.done = 0
+        self.bytes = 0
+        self.failures = 0
+        self.failed_urls = []
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def update(self, **fields):
+        with self._lock:
+            for key, value in fields.items():
+                setattr(self, key, value)
+
+    def advance(self, done, nbytes, failed_urls):
+        with self._lock:
+            self.done += done
+            self.bytes += nbytes
+            self.failures += len(failed_urls)
+            room = MAX_FAILED_URLS - len(self.failed_urls)
+            if room > 0:
+                self.failed_urls.extend(failed_urls[:room])
+
+    def to_dict(self):
+        with self._lock:
+            end = self.finished or time.time()
+            return {
+                'job': self.id,
+                'status': self.status,
+                'groups': self.groups,
+                'total': self.total,
+                'done': self.done,
+                'bytes': self.bytes,
+                'failures': self.failures,
+                'failed_urls': list(self.failed_urls),
+                'error': self.error,
+                'elapsed': round(end - self.started, 2) if self.started else 0.0,
+                'params': self.params,
+            }
+
+
+class PrefetchJobManager:
+    """任务登记与执行（单线程顺序执行，避免多个预热任务争抢下载带宽）"""
+
+    def __init__(self):
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='excel_sku_prefetch')
+
+    def submit(self, params):
+        job = PrefetchJob(params)
+        with self._lock:
+            self._jobs[job.id] = job
+            finished = [key for key, j in self._jobs.items() if j.finished]
+            for key in finished[:max(0, len(self._jobs) - MAX_JOBS)]:
+                del self._jobs[key]
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    @staticmethod
+    def _run(job):
+        job.update(status='running', started=time.time())
+        try:
+            run_prefetch(job, job.params)
+            job.update(status='done', finished=time.time())
+            print(f"✅ 缓存预热完成 [{job.id}]: {job.done}/{job.total} 张, "
+                  f"{job.bytes / 1024 / 1024:.1f} MB, 失败 {job.failures}")
+        except Exception as e:
+            job.update(status='failed', error=str(e), finished=time.time())
+            print(f"❌ 缓存预热失败 [{job.id}]: {e}")
+
+
+def resolve_workbook(excel_file):
+    """工作簿参数转为本地路径（URL 经远程工作簿缓存下载）"""
+    excel_file = excel_file.strip()
+    if is_url(excel_file):
+        return remote_workbooks.fetch(excel_file)[0]
+    if '\\' in excel_file or '/' in excel_file or ':' in excel_file:
+        path = excel_file
+    else:
+        path = os.path.join(excel_folder, excel_file)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Excel文件不存在: {path}")
+    return path
+
+
+def run_prefetch(job, params):
+    """
+    解析工作簿并预热图片缓存
+    decode 为 True 时同时解码进内存缓存（max_side 需与节点一致才能命中），
+    否则只写入磁盘缓存
+    任务使用独立的下载器和解码线程池，不重建节点共享的下载器和解码池
+    """
+    combined_sku_col = params.get('combined_sku_col', 'A')
+    sku_col = params.get('sku_col', 'B')
+    pcs_col = params.get('pcs_col', 'C')
+    url_col = params.get('url_col', 'D')
+    start_row = int(params.get('start_row', 2))
+    sheet_name = params.get('sheet_name', 'Sheet1')
+    decode = is_true(params.get('decode', True))
+
+    loader = ExcelSKULoader()
+    loader._prefetched = {}
+    loader._download_stats = {'fetched': 0, 'failed': 0, 'skipped': 0, 'bytes': 0,
+                              'seconds': 0.0, 'disk_hits': 0, 'revalidated': 0}
+    loader._failed_urls = OrderedDict()
+    loader._metrics = RunMetrics()
+    loader._max_side = int(params.get('max_side', 0))
+    # 任务使用同一缓存目录的独立实例，disk_cache_mb 只限制本任务，不修改节点共享缓存的上限
+    disk_cache_mb = int(params.get('disk_cache_mb', 2048))
+    loader._active_disk_cache = (DiskImageCache(image_cache_folder, disk_cache_mb * 1024 * 1024)
+                                 if disk_cache_mb > 0 else None)
+    if not decode and loader._active_disk_cache is None:
+        raise ValueError("只下载不解码时需要启用磁盘缓存 (disk_cache_mb > 0)")
+
+    columns = [
+        column_letter_to_index(combined_sku_col, 0),
+        column_letter_to_index(sku_col, 1),
+        column_letter_to_index(pcs_col, 2),
+        column_letter_to_index(url_col, 3),
+    ]
+    path = resolve_workbook(params['excel_file'])
+    df, _ = load_table(path, sheet_name, columns, start_row, sidecars=sidecars,
+                       build_sidecar=is_true(params.get('parquet_sidecar', False)))
+    filter_sku = params.get('filter_combined_sku', '')
+    row_index = None
+    if SkuFilter(filter_sku).active:
+        row_index = loader.get_row_index(path, sheet_name, combined_sku_col, start_row, df)
+    groups = loader.parse_sku_groups(df, combined_sku_col, sku_col, pcs_col, url_col,
+                                     start_row, filter_sku,
+                                     int(params.get('shard_index', 0)),
+                                     int(params.get('shard_count', 1)),
+                                     params.get('shard_mode', 'hash'), row_index)
+    urls = groups.unique_urls()
+    job.update(groups=len(groups), total=len(urls))
+
+    # 共享负缓存与熔断状态，连接池和线程池归本任务所有
+    downloader = ImageDownloader(max_workers=int(params.get('download_workers', 8)),
+                                 per_host_limit=int(params.get('per_host_limit', 4)),
+                                 retries=int(params.get('download_retries', 2)),
+                                 failures=loader._failure_cache,
+                                 breaker=loader._host_breaker)
+    loader._active_downloader = downloader
+    loader._decode_pool = DecodePool(int(params.get('decode_workers', 4)), "thread")
+    stats = loader._download_stats
+    try:
+        for start in range(0, len(urls), CHUNK_SIZE):
+            chunk = urls[start:start + CHUNK_SIZE]
+            bytes_before = stats['bytes']
+            if decode:
+                images = loader.load_images(chunk, use_cache=True)
+                failed = [url for url, img in zip(chunk, images) if img is None]
+            else:
+                results = downloader.fetch_all(chunk, cache=loader._active_disk_cache)
+                for result in results.values():
+                    loader.record_download(result)
+                failed = [url for url, result in results.items() if not result.ok]
+            job.advance(len(chunk), stats['bytes'] - bytes_before, failed)
+    finally:
+        downloader.close()
+        loader._decode_pool.close()
+
+
+prefetch_jobs = PrefetchJobManager()
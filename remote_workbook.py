@@ -0,0 +1,130 @@
+"""
+远程 Excel 工作簿本地缓存
+URL 工作簿下载到本地缓存目录并记录 ETag/Last-Modified，
+再次使用时发送条件请求（304 则直接复用本地文件），
+IS_CHANGED 通过 HEAD 请求生成稳定指纹
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from .downloader import DEFAULT_HEADERS
+from .lazy_imports import lazy_module
+
+requests = lazy_module('requests')
+
+
+class RemoteWorkbookCache:
+    """远程工作簿缓存（每个 URL 一个数据文件 + 一个 JSON 元数据文件）"""
+
+    def __init__(self, root, timeout=60):
+        self.root = root
+        self.timeout = timeout
+
+    def _paths(self, url):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+        ext = os.path.splitext(urlsplit(url).path)[1].lower()
+        if not ext or len(ext) > 6:
+            ext = '.bin'
+        base = os.path.join(self.root, digest)
+        return base + ext, base + '.json'
+
+    def _load_meta(self, url):
+        data_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('url') != url or not os.path.exists(data_path):
+            return None
+        return meta
+
+    def _write_atomic(self, path, data):
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def _fingerprint(etag, last_modified, content_length):
+        if etag:
+            return f"etag:{etag}"
+        if last_modified:
+            return f"lm:{last_modified}:{content_length or ''}"
+        return None
+
+    def fetch(self, url):
+        """
+        获取远程工作簿的本地路径
+        已缓存时发送条件请求，304 直接复用；返回 (本地路径, 是否重新下载)
+        """
+        data_path, meta_path = self._paths(url)
+        meta = self._load_meta(url)
+
+        headers = dict(DEFAULT_HEADERS)
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = requests.get(url, headers=headers, timeout=self.timeout, verify=False)
+        if response.status_code == 304 and meta:
+            return data_path, False
+        response.raise_for_status()
+
+        content = response.content
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        self._write_atomic(data_path, content)
+        new_meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_length': len(content),
+            'sha256': hashlib.sha256(content).hexdigest(),
+            'fingerprint': self._fingerprint(etag, last_modified, len(content)),
+            'fetched_at': time.time(),
+        }
+        self._write_atomic(meta_path, json.dumps(new_meta).encode('utf-8'))
+        return data_path, True
+
+    def fingerprint(self, url):
+        """
+        生成远程工作簿的稳定指纹（供 IS_CHANGED 使用）
+        优先使用 HEAD 返回的 ETag/Last-Modified；服务器不支持时退回条件 GET，
+        以内容哈希作为指纹。网络不可用时返回上次的指纹，没有则返回 None
+        """
+        meta = self._load_meta(url)
+        try:
+            response = requests.head(url, headers=DEFAULT_HEADERS, timeout=self.timeout,
+                                     verify=False, allow_redirects=True)
+            if response.ok:
+                fingerprint = self._fingerprint(response.headers.get('ETag'),
+                                                response.headers.get('Last-Modified'),
+                                                response.headers.get('Content-Length'))
+                if fingerprint:
+                    return fingerprint
+
+            # HEAD 不可用或没有校验头：条件 GET（未修改时不传输内容）
+            self.fetch(url)
+            meta = self._load_meta(url)
+        except (requests.exceptions.RequestException, OSError):
+            pass
+
+        if meta:
+            return meta.get('fingerprint') or f"sha256:{meta.get('sha256')}"
+        return None
@@ -0,0 +1,143 @@
+"""
+组合SKU行索引
+每个工作簿版本（路径 + mtime + 大小 + 工作表 + 组合SKU列 + 起始行）只扫描一次组合SKU列，
+记录每个组合SKU占据的行区间（组合SKU空值继承后连续相同的一段为一个区间），
+并持久化到磁盘；带过滤条件的运行只取出匹配分组的行，不再扫描和解析整张表
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from .lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+# 进程内保留的索引数
+MEMORY_ENTRIES = 16
+
+
+def fill_combined(column):
+    """组合SKU列：去除首尾空白，空值继承上一行（首个组合SKU之前的行为缺失值）"""
+    combined = column.map(str).str.strip()
+    combined = combined.where(~(column.isna() | combined.isin(['', 'nan'])))
+    return combined.ffill()
+
+
+class CombinedSkuIndex:
+    """
+    组合SKU → 行区间
+    names 按首次出现顺序；第 i 个区间 [starts[i], stops[i]) 为 0 基工作表行号，属于 names[owners[i]]
+    """
+
+    def __init__(self, names, owners, starts, stops):
+        self.names = names
+        self.owners = owners
+        self.starts = starts
+        self.stops = stops
+        self._ranges = None
+
+    @classmethod
+    def build(cls, df, combined_idx, start_row):
+        """扫描一次组合SKU列建立索引（df 索引为 0 基行号，且行号连续）"""
+        data = df[df.index >= max(start_row - 1, 0)]
+        empty = np.empty(0, dtype=np.int64)
+        if combined_idx not in data.columns or len(data) == 0:
+            return cls([], empty.astype(np.int32), empty, empty)
+
+        codes, names = pd.factorize(fill_combined(data[combined_idx]).to_numpy())
+        rows = data.index.to_numpy()
+        # 每段连续相同编号的起点
+        change = np.flatnonzero(np.diff(codes)) + 1
+        run_starts = np.concatenate([[0], change])
+        run_stops = np.concatenate([change, [len(codes)]])
+        run_codes = codes[run_starts]
+        named = run_codes >= 0
+        return cls(names.tolist(), run_codes[named].astype(np.int32),
+                   rows[run_starts[named]].astype(np.int64),
+                   rows[run_stops[named] - 1].astype(np.int64) + 1)
+
+    def _name_ranges(self):
+        if self._ranges is None:
+            ranges = {}
+            for owner, start, stop in zip(self.owners.tolist(), self.starts.tolist(),
+                                          self.stops.tolist()):
+                ranges.setdefault(self.names[owner], []).append((start, stop))
+            self._ranges = ranges
+        return self._ranges
+
+    def rows_for(self, names):
+        """names 占据的所有行号（升序，保持工作表顺序）"""
+        ranges = self._name_ranges()
+        spans = sorted(span for name in names for span in ranges.get(name, ()))
+        if not spans:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, stop, dtype=np.int64) for start, stop in spans])
+
+    def save(self, path, version):
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, version=np.array(version), names=np.array(self.names, dtype=str),
+                 owners=self.owners, starts=self.starts, stops=self.stops)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, version):
+        """读取磁盘上的索引，版本不一致或文件损坏时返回 None"""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if data['version'].tolist() != list(version):
+                    return None
+                return cls(data['names'].tolist(), data['owners'], data['starts'], data['stops'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+class RowIndexStore:
+    """按工作簿版本缓存的行索引（进程内 LRU + 磁盘持久化）"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, table_path, sheet_name, combined_idx, start_row):
+        key = f"{os.path.abspath(table_path)}|{sheet_name}|{combined_idx}|{start_row}"
+        return os.path.join(self.folder,
+                            hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest() + '.npz')
+
+    def get(self, table_path, sheet_name, combined_idx, start_row, df):
+        """
+        返回 (索引, 来源)，来源为 memory / disk / built
+        同一工作簿位置只保留最新版本的索引文件（版本变化时覆盖）
+        """
+        st = os.stat(table_path)
+        version = [str(st.st_mtime_ns), str(st.st_size)]
+        path = self._path(table_path, sheet_name, combined_idx, start_row)
+        memory_key = (path, tuple(version))
+
+        with self._lock:
+            index = self._memory.get(memory_key)
+            if index is not None:
+                self._memory.move_to_end(memory_key)
+                return index, 'memory'
+
+        index = CombinedSkuIndex.load(path, version)
+        source = 'disk'
+        if index is None:
+            index = CombinedSkuIndex.build(df, combined_idx, start_row)
+            source = 'built'
+            try:
+                os.makedirs(self.folder, exist_ok=True)
+                index.save(path, version)
+            except OSError as e:
+                print(f"⚠️ 组合SKU索引保存失败: {e}")
+
+        with self._lock:
+            for old_key in [k for k in self._memory if k[0] == path]:
+                del self._memory[old_key]
+            self._memory[memory_key] = index
+            while len(self._memory) > MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+        return index, source
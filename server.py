@@ -1,66 +1,189 @@
 """
-Excel 文件上传服务器
-为 ComfyUI 添加 Excel 文件上传支持
+Excel 文件上传与缓存预热服务器
+为 ComfyUI 添加 Excel 文件上传与图片缓存预热支持
+上传内容分块写入临时文件（文件 I/O 放到线程池，不阻塞事件循环），完成后原子重命名；
+可选在后台预解析工作簿，首次执行节点时直接命中解析缓存；
+可选在后台把 Excel 工作簿转换为 Parquet 副本，之后的读取按列内存映射
 """
 
+import asyncio
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
 import folder_paths
 from aiohttp import web
 import server
 from server import PromptServer
 
-# Excel 文件保存目录 - 直接使用input目录
+from .nodes import column_letter_to_index, is_true, sidecars
+from .prefetch import prefetch_jobs
+from .workbook import load_table, detect_format, SUPPORTED_EXTENSIONS
+
+# Excel 文件保存目录 - 直接使用input目录（首次上传时创建）
 excel_folder = folder_paths.get_input_directory()
-print(f"📁 Excel上传目录 (get_input_directory): {excel_folder}")
-os.makedirs(excel_folder, exist_ok=True)
+
+# 上传大小上限（MB），可通过环境变量调整
+MAX_UPLOAD_BYTES = int(os.environ.get('EXCEL_SKU_LOADER_MAX_UPLOAD_MB', '200')) * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# 后台预解析只用一个线程，避免占满 ComfyUI 的默认线程池
+_preparse_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='excel_sku_preparse')
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+async def _stream_to_file(field, target_path, max_bytes):
+    """
+    分块读取 multipart 字段写入同目录临时文件，完成后原子替换为 target_path
+    超过 max_bytes 时删除临时文件并抛出 UploadTooLarge；内容为空时不覆盖已有文件
+    返回写入字节数
+    """
+    loop = asyncio.get_running_loop()
+    fd, tmp_path = await loop.run_in_executor(
+        None, lambda: tempfile.mkstemp(dir=os.path.dirname(target_path), suffix='.part'))
+    f = os.fdopen(fd, 'wb')
+    size = 0
+    try:
+        while True:
+            chunk = await field.read_chunk(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge()
+            await loop.run_in_executor(None, f.write, chunk)
+        await loop.run_in_executor(None, f.close)
+        if size:
+            await loop.run_in_executor(None, os.replace, tmp_path, target_path)
+        else:
+            os.remove(tmp_path)
+        return size
+    except BaseException:
+        f.close()
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def preparse_workbook(file_path, sheet_name, columns, start_row, build_sidecar=False):
+    """
+    后台预解析：结果进入 load_table 的进程内缓存，键与节点执行时一致
+    build_sidecar 为 True 时先为 Excel 工作簿生成 Parquet 副本，再从副本读取
+    """
+    try:
+        df, from_cache = load_table(file_path, sheet_name, columns, start_row,
+                                    sidecars=sidecars, build_sidecar=build_sidecar)
+        print(f"📖 预解析完成: {os.path.basename(file_path)} [{sheet_name}] {len(df)} 行"
+              f"{'（已缓存）' if from_cache else ''}")
+    except Exception as e:
+        print(f"⚠️ 预解析失败: {os.path.basename(file_path)} [{sheet_name}]: {e}")
+
+
+def build_sidecar(file_path, sheet_name):
+    """后台生成 Parquet 副本（不预解析）"""
+    try:
+        if not sidecars.is_fresh(file_path, sheet_name):
+            sidecars.build(file_path, sheet_name)
+    except Exception as e:
+        print(f"⚠️ Parquet 副本生成失败: {os.path.basename(file_path)} [{sheet_name}]: {e}")
+
 
 @PromptServer.instance.routes.post("/excel_sku_loader/upload")
 async def upload_excel_file(request):
     """
     处理 Excel 文件上传
     端点: POST /excel_sku_loader/upload
+    字段: file（必填）；preparse、sheet_name、combined_sku_col、sku_col、pcs_col、url_col、
+         start_row（可选，preparse 为 true 时按这些参数在后台预解析）；
+         sidecar（可选，为 true 时在后台为 Excel 工作簿生成 Parquet 副本）
     """
     try:
+        if request.content_length is not None and request.content_length > MAX_UPLOAD_BYTES + UPLOAD_CHUNK_SIZE:
+            return web.json_response({
+                'error': f'文件过大，最大 {MAX_UPLOAD_BYTES // 1024 // 1024} MB',
+                'success': False
+            }, status=413)
+
         # 读取 multipart 数据
         reader = await request.multipart()
 
         filename = None
-        file_data = None
+        file_path = None
+        file_size = 0
+        options = {}
 
-        # 遍历所有字段
+        # 遍历所有字段（文件内容流式写盘，其他字段为小文本）
         async for field in reader:
-            if field.name == 'file':
-                filename = field.filename
-                file_data = await field.read()
-                break
+            if field.name == 'file' and filename is None:
+                # 只保留文件名部分，防止路径穿越
+                filename = os.path.basename((field.filename or '').replace('\\', '/'))
+                if not filename:
+                    break
 
-        if not filename or not file_data:
-            return web.json_response({
-                'error': '未找到文件',
-                'success': False
-            }, status=400)
+                # 验证文件扩展名（在读取内容之前）
+                ext = os.path.splitext(filename)[1].lower()
+                if ext not in SUPPORTED_EXTENSIONS:
+                    return web.json_response({
+                        'error': f'不支持的文件格式: {ext}，仅支持 {", ".join(SUPPORTED_EXTENSIONS)}',
+                        'success': False
+                    }, status=400)
+
+                os.makedirs(excel_folder, exist_ok=True)
+                file_path = os.path.join(excel_folder, filename)
+                try:
+                    file_size = await _stream_to_file(field, file_path, MAX_UPLOAD_BYTES)
+                except UploadTooLarge:
+                    return web.json_response({
+                        'error': f'文件过大，最大 {MAX_UPLOAD_BYTES // 1024 // 1024} MB',
+                        'success': False
+                    }, status=413)
+            elif field.name:
+                options[field.name] = (await field.text()).strip()
 
-        # 验证文件扩展名
-        ext = os.path.splitext(filename)[1].lower()
-        if ext not in ['.xlsx', '.xls', '.xlsm']:
+        if not filename or not file_size:
             return web.json_response({
-                'error': f'不支持的文件格式: {ext}，仅支持 .xlsx, .xls, .xlsm',
+                'error': '未找到文件',
                 'success': False
             }, status=400)
 
-        # 保存文件
-        file_path = os.path.join(excel_folder, filename)
-
-        with open(file_path, 'wb') as f:
-            f.write(file_data)
-
-        print(f"✅ Excel 文件上传成功: {filename}")
+        print(f"✅ Excel 文件上传成功: {filename} ({file_size / 1024 / 1024:.1f} MB)")
         print(f"   保存路径: {file_path}")
 
+        # 可选：后台预解析 / 生成 Parquet 副本（不等待完成）
+        preparse = is_true(options.get('preparse', ''))
+        sidecar = (is_true(options.get('sidecar', ''))
+                   and detect_format(file_path) in ('xlsx', 'xls') and sidecars.available())
+        sheet_name = options.get('sheet_name') or 'Sheet1'
+        if preparse:
+            columns = [
+                column_letter_to_index(options.get('combined_sku_col', 'A'), 0),
+                column_letter_to_index(options.get('sku_col', 'B'), 1),
+                column_letter_to_index(options.get('pcs_col', 'C'), 2),
+                column_letter_to_index(options.get('url_col', 'D'), 3),
+            ]
+            try:
+                start_row = int(options.get('start_row') or 2)
+            except ValueError:
+                start_row = 2
+            asyncio.get_running_loop().run_in_executor(
+                _preparse_executor, preparse_workbook, file_path, sheet_name, columns, start_row,
+                sidecar)
+        elif sidecar:
+            asyncio.get_running_loop().run_in_executor(
+                _preparse_executor, build_sidecar, file_path, sheet_name)
+
         return web.json_response({
             'success': True,
             'filename': filename,
             'path': file_path,
+            'size': file_size,
+            'preparse': preparse,
+            'sidecar': sidecar,
             'message': f'文件上传成功: {filename}'
         })
 
@@ -74,6 +197,42 @@ async def upload_excel_file(request):
             'success': False
         }, status=500)
 
-print(f"📊 Excel SKU Loader: 上传端点已注册")
-print(f"   URL: POST /excel_sku_loader/upload")
-print(f"   保存目录: {excel_folder}")
+@PromptServer.instance.routes.post("/excel_sku_loader/prefetch")
+async def start_prefetch(request):
+    """
+    启动缓存预热任务
+    端点: POST /excel_sku_loader/prefetch
+    JSON: excel_file（必填）、sheet_name、combined_sku_col、sku_col、pcs_col、url_col、start_row、
+          filter_combined_sku、decode（默认 true，解码进内存缓存）、max_side、disk_cache_mb、
+          download_workers、per_host_limit、download_retries、shard_index、shard_count、shard_mode、
+          parquet_sidecar（Excel 工作簿没有 Parquet 副本时先生成）
+    """
+    try:
+        params = await request.json()
+    except ValueError:
+        return web.json_response({'error': '请求体必须是 JSON', 'success': False}, status=400)
+
+    if not isinstance(params, dict) or not str(params.get('excel_file', '')).strip():
+        return web.json_response({'error': '请提供 excel_file', 'success': False}, status=400)
+
+    job = prefetch_jobs.submit(params)
+    print(f"🔥 缓存预热任务已提交 [{job.id}]: {params.get('excel_file')}")
+    return web.json_response({
+        'success': True,
+        'job': job.id,
+        'status_url': f"/excel_sku_loader/prefetch/{job.id}",
+    }, status=202)
+
+
+@PromptServer.instance.routes.get("/excel_sku_loader/prefetch/{job}")
+async def get_prefetch(request):
+    """
+    查询缓存预热进度
+    端点: GET /excel_sku_loader/prefetch/{job}
+    返回 status（queued/running/done/failed）、done/total、bytes、failures
+    """
+    job = prefetch_jobs.get(request.match_info['job'])
+    if job is None:
+        return web.json_response({'error': '任务不存在', 'success': False}, status=404)
+    return web.json_response({'success': True, **job.to_dict()})
+
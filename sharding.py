@@ -0,0 +1,118 @@
+"""
+组合SKU分片
+多个 ComfyUI 实例处理同一工作簿时，把组合SKU确定性地划分到 shard_count 个分片，
+每个实例只处理 shard_index 对应的分片：
+- hash: 每个组合SKU按稳定哈希取模，归属只取决于名称本身（增删其他分组不影响其归属）
+- weighted: 按图片数从多到少贪心分配给当前负载最小的分片，各分片图片数更均衡；
+  归属取决于整份工作簿的分组，所有实例必须读取同一版本的工作簿（用清单中的 workbook_digest 核对）
+每个分片输出一份清单（分配到的分组、数量、耗时），协调端汇总清单即可确认全部分组都被覆盖
+"""
+
+import hashlib
+import heapq
+import json
+import os
+
+SHARD_MODES = ["hash", "weighted"]
+
+
+def stable_hash(name):
+    """与进程、平台无关的 64 位哈希（内置 hash() 对字符串每个进程随机化）"""
+    return int.from_bytes(hashlib.blake2b(name.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def groups_digest(names):
+    """整份工作簿（过滤后）的组合SKU序列摘要，各分片一致说明读取的是同一版本"""
+    digest = hashlib.blake2b(digest_size=16)
+    for name in names:
+        digest.update(name.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def shard_range_error(shard_index, shard_count):
+    """分片参数超出范围时返回错误信息，否则返回 None"""
+    if shard_count < 1:
+        return f"分片数 {shard_count} 必须大于 0"
+    if not 0 <= shard_index < shard_count:
+        return f"分片序号 {shard_index} 超出范围 (分片数 {shard_count}，序号应为 0~{shard_count - 1})"
+    return None
+
+
+def assign_shards(names, weights, shard_count, mode="hash"):
+    """
+    返回与 names 一一对应的分片号列表
+    weighted 模式按 (图片数降序, 稳定哈希) 的顺序分配，结果与分组在表中的顺序无关
+    """
+    if shard_count <= 1:
+        return [0] * len(names)
+    if mode != "weighted":
+        return [stable_hash(name) % shard_count for name in names]
+
+    hashes = [stable_hash(name) for name in names]
+    order = sorted(range(len(names)), key=lambda i: (-weights[i], hashes[i], names[i]))
+    loads = [(0, shard) for shard in range(shard_count)]
+    shards = [0] * len(names)
+    for i in order:
+        load, shard = heapq.heappop(loads)
+        shards[i] = shard
+        heapq.heappush(loads, (load + weights[i], shard))
+    return shards
+
+
+class ShardAssignment:
+    """一次解析得到的分片划分（所有分片的分配结果，当前实例只处理其中一个）"""
+
+    def __init__(self, names, weights, shard_index, shard_count, mode="hash"):
+        error = shard_range_error(shard_index, shard_count)
+        if error:
+            raise ValueError(error)
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.mode = mode if mode in SHARD_MODES else "hash"
+        self.total_groups = len(names)
+        self.total_items = int(sum(weights))
+        self.digest = groups_digest(names)
+        shards = assign_shards(names, weights, shard_count, self.mode)
+        self.loads = [0] * shard_count
+        self.groups = []
+        self.items = 0
+        for name, weight, shard in zip(names, weights, shards):
+            self.loads[shard] += int(weight)
+            if shard == shard_index:
+                self.groups.append(name)
+                self.items += int(weight)
+
+    def report_line(self):
+        return (f"分片: {self.shard_index + 1}/{self.shard_count} ({self.mode}), "
+                f"{len(self.groups)}/{self.total_groups} 个组合SKU, "
+                f"{self.items}/{self.total_items} 张图片")
+
+    def manifest(self, **extra):
+        """当前分片的清单：协调端核对 workbook_digest 一致、各分片 groups 互不重叠且合计为 workbook_groups"""
+        return {
+            'shard_index': self.shard_index,
+            'shard_count': self.shard_count,
+            'mode': self.mode,
+            'workbook_digest': self.digest,
+            'workbook_groups': self.total_groups,
+            'workbook_items': self.total_items,
+            'shard_loads': self.loads,
+            'group_count': len(self.groups),
+            'items': self.items,
+            **extra,
+            'groups': self.groups,
+        }
+
+    def write_manifest(self, folder, manifest, group_offset=0):
+        """写入清单文件（先写临时文件再替换），返回路径"""
+        os.makedirs(folder, exist_ok=True)
+        name = f"{self.digest[:16]}-shard{self.shard_index}of{self.shard_count}"
+        if group_offset:
+            name += f"-offset{group_offset}"
+        path = os.path.join(folder, name + ".json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        return path
@@ -0,0 +1,128 @@
+"""
+组合SKU过滤条件
+filter_combined_sku 支持多个条件（满足任意一个即保留）：
+- 精确值：ABC-001
+- 前缀 / 通配符：ABC-* 、A?C-*（* 匹配任意字符，? 匹配单个字符）
+- 正则：re:^ABC-\\d{3}$（re: 之后直到行尾都属于该正则，其中的逗号不作为分隔符）
+条件之间用换行、逗号或分号分隔
+整行先按精确值匹配：工作簿中有与整行完全相同的组合SKU（如 A,B 或 A*B）时只保留该组合SKU，
+不再拆分或按通配符/正则解释
+"""
+
+import fnmatch
+import re
+
+_SEPARATORS = re.compile(r'[,;，；]')
+# 行首或分隔符之后的 re: 开始一个正则条件
+_REGEX_START = re.compile(r'(?:^|[,;，；])\s*re:')
+
+
+class _Terms:
+    """一组条件：精确值 / 前缀 / 通配符 / 正则"""
+
+    def __init__(self):
+        self.exact = set()
+        self.prefixes = []
+        self.globs = []
+        self.patterns = []
+
+    def merge(self, other):
+        self.exact |= other.exact
+        self.prefixes.extend(other.prefixes)
+        self.globs.extend(other.globs)
+        self.patterns.extend(other.patterns)
+
+    def only_exact(self):
+        return not (self.prefixes or self.globs or self.patterns)
+
+    def matches(self, name):
+        if name in self.exact:
+            return True
+        if self.prefixes and name.startswith(tuple(self.prefixes)):
+            return True
+        if any(fnmatch.fnmatchcase(name, glob) for glob in self.globs):
+            return True
+        return any(pattern.search(name) for pattern in self.patterns)
+
+
+def _parse_line(line):
+    """解析一行条件"""
+    terms = _Terms()
+    regex_start = _REGEX_START.search(line)
+    if regex_start:
+        pattern = line[regex_start.end():].strip()
+        line = line[:regex_start.start()]
+        if pattern:
+            try:
+                terms.patterns.append(re.compile(pattern))
+            except re.error as e:
+                raise ValueError(f"过滤正则无效: {pattern} ({e})")
+    for term in _SEPARATORS.split(line):
+        term = term.strip()
+        if not term:
+            continue
+        if '*' not in term and '?' not in term:
+            terms.exact.add(term)
+        elif term.endswith('*') and not any(ch in term[:-1] for ch in '*?['):
+            terms.prefixes.append(term[:-1])
+        else:
+            terms.globs.append(term)
+    return terms
+
+
+class SkuFilter:
+    """解析后的过滤条件（未设置任何条件时 active 为 False，不过滤）"""
+
+    def __init__(self, text=""):
+        self.exact = set()
+        # 会被拆分或按通配符/正则解释的整行 -> 该行解析出的条件
+        self.lines = {}
+        for line in (text or "").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            terms = _parse_line(line)
+            if terms.only_exact() and terms.exact == {line}:
+                self.exact.add(line)
+            else:
+                self.lines[line] = terms
+
+    @property
+    def active(self):
+        return bool(self.exact or self.lines)
+
+    def resolve(self, names):
+        """按名称集合确定生效的条件：与某个名称完全相同的整行只作为精确值"""
+        terms = _Terms()
+        terms.exact |= self.exact
+        for line, line_terms in self.lines.items():
+            if line in names:
+                terms.exact.add(line)
+            else:
+                terms.merge(line_terms)
+        return terms
+
+    def select(self, names):
+        """按原顺序返回匹配的名称"""
+        terms = self.resolve(set(names))
+        if terms.only_exact():
+            return [name for name in names if name in terms.exact]
+        return [name for name in names if terms.matches(name)]
+
+    def unmatched(self, matched):
+        """select 结果中缺少的精确值（已整行匹配的行不再拆分检查）"""
+        matched = set(matched)
+        return sorted(self.resolve(matched).exact - matched)
+
+    def describe(self):
+        terms = self.resolve(())
+        parts = []
+        if terms.exact:
+            parts.append(f"{len(terms.exact)} 个精确值")
+        if terms.prefixes:
+            parts.append(f"{len(terms.prefixes)} 个前缀")
+        if terms.globs:
+            parts.append(f"{len(terms.globs)} 个通配符")
+        if terms.patterns:
+            parts.append(f"{len(terms.patterns)} 个正则")
+        return ", ".join(parts)
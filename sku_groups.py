@@ -0,0 +1,197 @@
+"""
+组合SKU分组的列式存储
+每行（子SKU）只占数组中的一个位置，不再为每行创建字典：
+- 行数据：SKU 字符串数组、int32 PCS 数组、int32 URL 编号数组（URL 去重驻留在 url_table 中）
+- 分组索引：每个组合SKU的起始行与行数（同一组合SKU的行连续存放）
+切片、筛选只复制分组索引，行数据在所有视图之间共享
+"""
+
+from .lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+
+
+class SkuRows:
+    """行数据（只读，多个 SkuGroups 视图共享）"""
+
+    __slots__ = ('skus', 'pcs', 'url_ids', 'url_table', '_url_index')
+
+    def __init__(self, skus, pcs, url_ids, url_table):
+        self.skus = skus
+        self.pcs = pcs
+        self.url_ids = url_ids
+        self.url_table = url_table
+        self._url_index = None
+
+    def url_index(self):
+        """URL → 编号（按需建立）"""
+        if self._url_index is None:
+            self._url_index = {url: i for i, url in enumerate(self.url_table.tolist())}
+        return self._url_index
+
+
+class SkuGroup:
+    """单个组合SKU的只读视图，各列按需从共享行数据中切出"""
+
+    __slots__ = ('name', '_rows', '_start', '_stop')
+
+    def __init__(self, name, rows, start, length):
+        self.name = name
+        self._rows = rows
+        self._start = start
+        self._stop = start + length
+
+    def __len__(self):
+        return self._stop - self._start
+
+    @property
+    def skus(self):
+        return self._rows.skus[self._start:self._stop].tolist()
+
+    @property
+    def pcs(self):
+        return self._rows.pcs[self._start:self._stop].tolist()
+
+    @property
+    def urls(self):
+        return self._rows.url_table[self._rows.url_ids[self._start:self._stop]].tolist()
+
+
+class SkuGroups:
+    """
+    有序的组合SKU分组集合（按组合SKU首次出现的顺序）
+    接口与有序字典相近：len / in / keys / items / groups[组合SKU]（O(1) 查找）
+    """
+
+    def __init__(self, names, starts, lengths, rows):
+        self.names = names
+        self.starts = starts
+        self.lengths = lengths
+        self.rows = rows
+        self._index = None
+
+    @classmethod
+    def empty(cls):
+        rows = SkuRows(np.empty(0, dtype=object), np.empty(0, dtype=np.int32),
+                       np.empty(0, dtype=np.int32), np.empty(0, dtype=object))
+        return cls([], np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), rows)
+
+    @classmethod
+    def from_columns(cls, names, group_codes, skus, pcs, urls):
+        """
+        由逐行的列构建
+        names: 分组名称（顺序即分组顺序，可包含没有任何行的分组）
+        group_codes: 每行所属分组在 names 中的位置；其余参数为逐行的列
+        同一分组不连续的行按原顺序归并到一起
+        """
+        group_codes = np.asarray(group_codes, dtype=np.int64)
+        order = np.argsort(group_codes, kind='stable')
+        lengths = np.bincount(group_codes, minlength=len(names)).astype(np.int64)
+        starts = np.zeros(len(names), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=starts[1:])
+
+        url_ids, url_table = _intern(np.asarray(urls, dtype=object)[order])
+        rows = SkuRows(np.asarray(skus, dtype=object)[order],
+                       np.asarray(pcs, dtype=np.int32)[order],
+                       url_ids, url_table)
+        return cls(list(names), starts, lengths, rows)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self._lookup()
+
+    def __getitem__(self, name):
+        return self.group(self._lookup()[name])
+
+    def _lookup(self):
+        if self._index is None:
+            self._index = {name: pos for pos, name in enumerate(self.names)}
+        return self._index
+
+    def keys(self):
+        return list(self.names)
+
+    def group(self, pos):
+        return SkuGroup(self.names[pos], self.rows, int(self.starts[pos]), int(self.lengths[pos]))
+
+    def items(self):
+        for pos, name in enumerate(self.names):
+            yield name, self.group(pos)
+
+    @property
+    def item_count(self):
+        """所有分组的行数合计"""
+        return int(self.lengths.sum())
+
+    def slice(self, start, stop):
+        """按分组位置切片（只复制分组索引）"""
+        return SkuGroups(self.names[start:stop], self.starts[start:stop],
+                         self.lengths[start:stop], self.rows)
+
+    def take(self, positions):
+        """按分组位置（整数数组或布尔掩码）筛选"""
+        positions = np.flatnonzero(positions) if np.asarray(positions).dtype == bool \
+            else np.asarray(positions, dtype=np.int64)
+        return SkuGroups([self.names[pos] for pos in positions.tolist()],
+                         self.starts[positions], self.lengths[positions], self.rows)
+
+    def exclude(self, names):
+        """去掉 names 中的分组"""
+        if not names:
+            return self
+        return self.take(np.array([name not in names for name in self.names], dtype=bool))
+
+    def row_indices(self):
+        """本视图内所有行在共享行数据中的位置（按分组顺序）"""
+        total = self.item_count
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        offsets = np.cumsum(self.lengths) - self.lengths
+        return np.repeat(self.starts - offsets, self.lengths) + np.arange(total)
+
+    def row_groups(self):
+        """与 row_indices 一一对应的分组位置"""
+        return np.repeat(np.arange(len(self.names)), self.lengths)
+
+    def unique_urls(self):
+        """本视图引用的不重复 URL（按首次出现顺序）"""
+        ids = self.rows.url_ids[self.row_indices()]
+        unique, first = np.unique(ids, return_index=True)
+        return self.rows.url_table[unique[np.argsort(first, kind='stable')]].tolist()
+
+    def url_counts(self):
+        """[(URL, 被引用次数)]，按 URL 编号顺序"""
+        ids = self.rows.url_ids[self.row_indices()]
+        counts = np.bincount(ids, minlength=len(self.rows.url_table))
+        used = np.flatnonzero(counts)
+        return list(zip(self.rows.url_table[used].tolist(), counts[used].tolist()))
+
+    def url_references(self, urls):
+        """{URL: ["组合SKU/SKU", ...]}：列出引用这些 URL 的行"""
+        url_index = self.rows.url_index()
+        wanted = [url_index[url] for url in urls if url in url_index]
+        refs = {}
+        if not wanted:
+            return refs
+        rows = self.row_indices()
+        hits = np.flatnonzero(np.isin(self.rows.url_ids[rows], wanted))
+        groups = self.row_groups()[hits]
+        for row, pos in zip(rows[hits].tolist(), groups.tolist()):
+            url = self.rows.url_table[self.rows.url_ids[row]]
+            refs.setdefault(url, []).append(f"{self.names[pos]}/{self.rows.skus[row]}")
+        return refs
+
+
+def _intern(values):
+    """字符串数组去重编号：返回 (int32 编号数组, 按首次出现顺序的去重值数组)"""
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=object)
+    table = {}
+    ids = np.fromiter((table.setdefault(value, len(table)) for value in values.tolist()),
+                      dtype=np.int32, count=len(values))
+    return ids, np.array(list(table), dtype=object)
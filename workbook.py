@@ -0,0 +1,622 @@
+"""
+工作簿读取层
+只读取需要的列和 start_row 之后的行：
+- .xlsx 直接流式解析工作表 XML（日期/时间格式的单元格按样式转换，与 pandas.read_excel 一致）；
+  .xls 回退到 pandas.read_excel
+- CSV 只解析需要的列，单元格按文本读取
+- Parquet / Arrow IPC 内存映射读取，只取需要的列（需要 pyarrow）
+- Excel 工作簿可转换为 Parquet 副本（sidecar），之后的读取直接走 Parquet
+解析结果按 (路径, mtime, 大小, 工作表, 列, 起始行) 缓存在进程内
+列式文件没有工作表，第 1 行视为表头（列名），数据从第 2 行开始；列字母按列的位置对应
+"""
+
+import hashlib
+import os
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+from .lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+# 与 pandas.read_excel 默认一致的缺失值文本
+NA_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None',
+    'n/a', 'nan', 'null',
+])
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls', '.xlsm')
+CSV_EXTENSIONS = ('.csv', '.tsv')
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+SUPPORTED_EXTENSIONS = EXCEL_EXTENSIONS + CSV_EXTENSIONS + PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+
+# 文件头魔数
+_PARQUET_MAGIC = b'PAR1'
+_ARROW_MAGIC = b'ARROW1'
+_OLE_MAGIC = bytes.fromhex('D0CF11E0A1B11AE1')
+_ZIP_MAGIC = b'PK\x03\x04'
+# 识别格式时读取的文件头字节数（判断是否为文本）
+_SNIFF_BYTES = 4096
+
+# Parquet 副本中保存原始 0 基行号的列
+ROW_COLUMN = '__row__'
+
+_table_cache = OrderedDict()
+_table_cache_lock = threading.Lock()
+TABLE_CACHE_MAX_ENTRIES = 8
+
+
+def _convert_cell(value):
+    """按 pandas.read_excel 的规则转换单元格值"""
+    if value is None:
+        return np.nan
+    if isinstance(value, str):
+        return np.nan if value in NA_STRINGS else value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+def _cell_column(ref):
+    """单元格引用（如 "AB12"）转为 0 基列号"""
+    index = 0
+    for ch in ref:
+        if ch.isdigit():
+            break
+        index = index * 26 + (ord(ch) - 64)
+    return index - 1
+
+
+def _sheet_part(zf, sheet_name):
+    """根据工作表名称找到 zip 中的 XML 路径"""
+    workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    rel_id = None
+    for sheet in workbook.iter(_NS + 'sheet'):
+        if sheet.get('name') == sheet_name:
+            rel_id = sheet.get(_REL_NS + 'id')
+            break
+    if rel_id is None:
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    for rel in rels.iter(_PKG_REL_NS + 'Relationship'):
+        if rel.get('Id') == rel_id:
+            target = rel.get('Target')
+            return target.lstrip('/') if target.startswith('/') else 'xl/' + target
+    raise ValueError(f"Worksheet named '{sheet_name}' not found")
+
+
+def _iter_elements(f, tag, parent_tag):
+    """
+    流式产出 tag 元素（完整解析后），调用方处理完毕后元素即从父元素 parent_tag 中移除，
+    已处理的元素不会留在树中，内存不随行数增长
+    """
+    parent = None
+    for event, elem in ET.iterparse(f, events=('start', 'end')):
+        if event == 'start':
+            if elem.tag == parent_tag:
+                parent = elem
+        elif elem.tag == tag:
+            yield elem
+            if parent is not None:
+                parent.remove(elem)
+            else:
+                elem.clear()
+
+
+def _shared_strings(zf):
+    """流式读取共享字符串表（富文本拼接各段，忽略注音）"""
+    if 'xl/sharedStrings.xml' not in zf.namelist():
+        return []
+    strings = []
+    with zf.open('xl/sharedStrings.xml') as f:
+        for elem in _iter_elements(f, _NS + 'si', _NS + 'sst'):
+            phonetic = {t for rph in elem.iter(_NS + 'rPh') for t in rph.iter(_NS + 't')}
+            strings.append(''.join(t.text or '' for t in elem.iter(_NS + 't')
+                                   if t not in phonetic))
+    return strings
+
+
+class _DateStyles:
+    """
+    工作簿中日期/时间数字格式的单元格样式（styles.xml 中 cellXfs 的序号）
+    判断规则与序列值转换使用 openpyxl（pandas.read_excel 读取 xlsx 时的引擎），结果与其一致；
+    所有样式都是常规格式时不导入 openpyxl
+    """
+
+    def __init__(self, zf):
+        self.dates = set()
+        self.timedeltas = set()
+        self.epoch = None
+        if 'xl/styles.xml' not in zf.namelist():
+            return
+        root = ET.fromstring(zf.read('xl/styles.xml'))
+        custom = {fmt.get('numFmtId'): fmt.get('formatCode')
+                  for fmt in root.iter(_NS + 'numFmt')}
+        cell_xfs = root.find(_NS + 'cellXfs')
+        format_ids = [xf.get('numFmtId', '0') for xf in
+                      (cell_xfs.iter(_NS + 'xf') if cell_xfs is not None else ())]
+        if not any(format_id != '0' for format_id in format_ids):
+            return
+
+        from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+        from openpyxl.utils.datetime import MAC_EPOCH, WINDOWS_EPOCH
+
+        for index, format_id in enumerate(format_ids):
+            fmt = custom[format_id] if format_id in custom else builtin_format_code(int(format_id))
+            if is_date_format(fmt):
+                self.dates.add(str(index))
+            if is_timedelta_format(fmt):
+                self.timedeltas.add(str(index))
+        workbook_pr = ET.fromstring(zf.read('xl/workbook.xml')).find(_NS + 'workbookPr')
+        date1904 = workbook_pr is not None and workbook_pr.get('date1904') in ('1', 'true')
+        self.epoch = MAC_EPOCH if date1904 else WINDOWS_EPOCH
+
+    def convert(self, style, number):
+        """日期样式的序列值转为 datetime / time / timedelta，超出日期范围时为缺失"""
+        from openpyxl.utils.datetime import from_excel
+        try:
+            return from_excel(number, self.epoch, timedelta=style in self.timedeltas)
+        except (OverflowError, ValueError):
+            return np.nan
+
+
+def _cell_value(cell, cell_type, shared, date_styles):
+    """按单元格类型（与日期样式）解析值，规则与 pandas.read_excel 一致"""
+    if cell_type == 'inlineStr':
+        return _convert_cell(''.join(t.text or '' for t in cell.iter(_NS + 't')))
+
+    v = cell.find(_NS + 'v')
+    if v is None or v.text is None:
+        return np.nan
+    text = v.text
+    if cell_type == 's':
+        return _convert_cell(shared[int(text)])
+    if cell_type == 'str':
+        return _convert_cell(text)
+    if cell_type == 'd':
+        from openpyxl.utils.datetime import from_ISO8601
+        try:
+            return from_ISO8601(text)
+        except ValueError:
+            return _convert_cell(text)
+    if cell_type == 'b':
+        return text == '1'
+    if cell_type == 'e':
+        return np.nan
+    try:
+        number = float(text)
+    except ValueError:
+        return _convert_cell(text)
+    if date_styles.dates:
+        style = cell.get('s', '0')
+        if style in date_styles.dates:
+            return date_styles.convert(style, number)
+    return _convert_cell(number)
+
+
+def _read_xlsx_columns(source, sheet_name, columns, start_row):
+    """
+    流式解析 xlsx 工作表 XML，只处理需要的列和行
+    比 openpyxl 逐单元格构建对象快得多，内存只与投影列的大小相关
+    columns 为 None 时读取所有列（用于生成 Parquet 副本）
+    """
+    if columns is None:
+        return _read_xlsx_all_columns(source, sheet_name, start_row)
+    wanted = {col: i for i, col in enumerate(columns)}
+    rows = []
+    row_numbers = []
+
+    with zipfile.ZipFile(source) as zf:
+        part = _sheet_part(zf, sheet_name)
+        shared = _shared_strings(zf)
+        date_styles = _DateStyles(zf)
+
+        with zf.open(part) as f:
+            cell_tag = _NS + 'c'
+            next_row = 1
+            # 已处理的行立即从 sheetData 中移除并释放其单元格
+            for elem in _iter_elements(f, _NS + 'row', _NS + 'sheetData'):
+                r = elem.get('r')
+                row_number = int(r) if r else next_row
+                next_row = row_number + 1
+                if row_number >= start_row:
+                    values = [np.nan] * len(columns)
+                    found = False
+                    col = -1
+                    for cell in elem.iter(cell_tag):
+                        ref = cell.get('r')
+                        col = _cell_column(ref) if ref else col + 1
+                        slot = wanted.get(col)
+                        if slot is not None:
+                            values[slot] = _cell_value(cell, cell.get('t'), shared, date_styles)
+                            found = True
+                    if found:
+                        rows.append(values)
+                        row_numbers.append(row_number - 1)
+
+    # 补齐中间的空行，使索引与原始行号一一对应
+    last = row_numbers[-1] + 1 if row_numbers else start_row - 1
+    index = pd.RangeIndex(start_row - 1, last)
+    df = pd.DataFrame(rows, columns=columns, index=row_numbers, dtype=object)
+    # 末尾全空的行不会出现（与 read_excel 一致）
+    return df.reindex(index) if len(df) != len(index) else df.set_axis(index)
+
+
+def _read_xlsx_all_columns(source, sheet_name, start_row):
+    """读取工作表的所有列（列名为 0 基列号，中间的空列不补齐）"""
+    rows = []
+    row_numbers = []
+    with zipfile.ZipFile(source) as zf:
+        part = _sheet_part(zf, sheet_name)
+        shared = _shared_strings(zf)
+        date_styles = _DateStyles(zf)
+        with zf.open(part) as f:
+            cell_tag = _NS + 'c'
+            next_row = 1
+            for elem in _iter_elements(f, _NS + 'row', _NS + 'sheetData'):
+                r = elem.get('r')
+                row_number = int(r) if r else next_row
+                next_row = row_number + 1
+                if row_number >= start_row:
+                    values = {}
+                    col = -1
+                    for cell in elem.iter(cell_tag):
+                        ref = cell.get('r')
+                        col = _cell_column(ref) if ref else col + 1
+                        value = _cell_value(cell, cell.get('t'), shared, date_styles)
+                        if not (isinstance(value, float) and np.isnan(value)):
+                            values[col] = value
+                    if values:
+                        rows.append(values)
+                        row_numbers.append(row_number - 1)
+
+    last = row_numbers[-1] + 1 if row_numbers else start_row - 1
+    columns = sorted({col for values in rows for col in values})
+    df = pd.DataFrame(rows, index=row_numbers, columns=columns, dtype=object)
+    return df.reindex(pd.RangeIndex(start_row - 1, last)).where(lambda d: d.notna(), np.nan)
+
+
+def _read_excel_columns(source, sheet_name, columns, start_row):
+    """非 xlsx 格式（如 .xls）回退到 pandas.read_excel 后再投影"""
+    full = pd.read_excel(source, sheet_name=sheet_name, header=None)
+    full = full.iloc[start_row - 1:]
+    if columns is None:
+        return full
+    present = [col for col in columns if col < full.shape[1]]
+    return full.iloc[:, present]
+
+
+def _csv_separator(path):
+    """.tsv 为制表符、.csv 为逗号；其他扩展名按首行判断（只含制表符时为 TSV）"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in CSV_EXTENSIONS:
+        return '\t' if ext == '.tsv' else ','
+    with open(path, 'rb') as f:
+        first_line = f.readline(_SNIFF_BYTES)
+    return '\t' if b'\t' in first_line and b',' not in first_line else ','
+
+
+def _read_csv_columns(path, columns, start_row):
+    """
+    CSV / TSV：只解析需要的列，单元格按文本读取（与 Excel 文本单元格一致，保留 SKU 前导零）
+    空行保留，行号与文件行一一对应；编码依次尝试 UTF-8（含 BOM）和 GB18030
+    """
+    sep = _csv_separator(path)
+    for encoding in ('utf-8-sig', 'gb18030'):
+        try:
+            usecols = None
+            if columns is not None:
+                # 列数以第一行为准（与 pandas 一致），只解析其中存在的列
+                width = pd.read_csv(path, sep=sep, header=None, dtype=str, encoding=encoding,
+                                    nrows=1).shape[1]
+                usecols = [col for col in columns if col < width]
+            df = pd.read_csv(path, sep=sep, header=None, dtype=str, encoding=encoding,
+                             usecols=usecols, skiprows=range(start_row - 1), keep_default_na=False,
+                             na_values=list(NA_STRINGS), skip_blank_lines=False)
+            break
+        except UnicodeDecodeError:
+            continue
+        except pd.errors.EmptyDataError:
+            df = pd.DataFrame()
+            break
+    else:
+        raise ValueError(f"无法识别 CSV 文件编码: {path}")
+    df = df.astype(object).where(df.notna(), np.nan)
+    df.index = pd.RangeIndex(start_row - 1, start_row - 1 + len(df))
+    # 末尾全空的行不计入（与 Excel 读取一致）
+    filled = np.flatnonzero(df.notna().any(axis=1).to_numpy())
+    return df.iloc[:filled[-1] + 1] if len(filled) else df.iloc[:0]
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise ImportError("读取 Parquet / Arrow 文件需要安装 pyarrow: pip install pyarrow")
+
+
+def _arrow_column(array):
+    """Arrow 列转为与 Excel 读取结果一致的值：缺失为 NaN，文本中的缺失值标记视为缺失"""
+    pa = _require_pyarrow()
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        values = pd.Series(array.to_numpy(zero_copy_only=False), dtype=object)
+        return values.where(values.notna() & ~values.isin(NA_STRINGS), np.nan)
+    if pa.types.is_integer(array.type):
+        if array.null_count == 0:
+            return pd.Series(array.to_numpy())
+        return array.to_pandas(integer_object_nulls=True).fillna(np.nan)
+    if pa.types.is_floating(array.type):
+        # 与 Excel 数字单元格一致：整数值的浮点数转为整数（避免 SKU 变成 "1.0"）
+        values = array.to_numpy(zero_copy_only=False).astype(np.float64)
+        whole = np.isfinite(values) & (values == np.trunc(values)) & (np.abs(values) < 2 ** 63)
+        if not whole.any():
+            return pd.Series(values)
+        converted = values.astype(object)
+        converted[whole] = values[whole].astype(np.int64).astype(object)
+        return pd.Series(converted, dtype=object)
+    values = array.to_pandas().astype(object)
+    return values.where(values.notna(), np.nan)
+
+
+def _arrow_frame(table, columns, names, row_numbers):
+    """按 (0 基列号 → Arrow 列名) 投影成以列号为列名、行号为索引的 DataFrame"""
+    data = {col: _arrow_column(table.column(name)).to_numpy() for col, name in zip(columns, names)}
+    return pd.DataFrame(data, index=pd.Index(row_numbers, dtype=np.int64), columns=list(columns))
+
+
+def _read_columnar(path, fmt, columns, start_row):
+    """
+    Parquet / Arrow IPC：内存映射读取，只解码需要的列
+    第 1 行为表头，第 i 条记录对应 0 基行号 i
+    """
+    pa = _require_pyarrow()
+    if fmt == 'parquet':
+        schema_names = pa.parquet.read_schema(path, memory_map=True).names
+    else:
+        source = pa.memory_map(path)
+        try:
+            table = pa.ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            source.seek(0)
+            table = pa.ipc.open_stream(source).read_all()
+        schema_names = table.schema.names
+
+    if columns is None:
+        columns = list(range(len(schema_names)))
+    present = [col for col in columns if col < len(schema_names)]
+    names = [schema_names[col] for col in present]
+    if fmt == 'parquet':
+        table = pa.parquet.read_table(path, columns=names, memory_map=True)
+    else:
+        table = table.select(present)
+
+    offset = max(start_row - 2, 0)
+    table = table.slice(offset)
+    row_numbers = np.arange(offset + 1, offset + 1 + table.num_rows)
+    return _arrow_frame(table, present, names, row_numbers)
+
+
+def detect_format(source):
+    """
+    识别格式：xlsx / xls / parquet / arrow / csv
+    .csv / .tsv 扩展名直接按文本读取（首个单元格可能恰好以 PK 等魔数开头）；
+    其余按文件头识别，识别不了时按扩展名，没有可用扩展名（如远程工作簿缓存的 .bin）
+    且内容不含 NUL 字节时按 CSV 读取
+    """
+    if not isinstance(source, str):
+        return 'xlsx' if zipfile.is_zipfile(source) else 'xls'
+    ext = os.path.splitext(source)[1].lower()
+    if ext in CSV_EXTENSIONS:
+        return 'csv'
+    with open(source, 'rb') as f:
+        head = f.read(_SNIFF_BYTES)
+    if head.startswith(_PARQUET_MAGIC):
+        return 'parquet'
+    if head.startswith(_ARROW_MAGIC):
+        return 'arrow'
+    if head.startswith(_ZIP_MAGIC):
+        return 'xlsx'
+    if head.startswith(_OLE_MAGIC):
+        return 'xls'
+    if ext in ARROW_EXTENSIONS:
+        return 'arrow'
+    if ext not in EXCEL_EXTENSIONS and b'\0' not in head:
+        return 'csv'
+    return 'xls'
+
+
+def read_table_columns(source, sheet_name, columns, start_row=1):
+    """
+    读取工作表中指定的列（0 基列号，None 为所有列），只保留 start_row 及之后的行
+    返回的 DataFrame 以原始列号为列名、原始 0 基行号为索引
+    source 可以是文件路径或二进制文件对象（文件对象只支持 Excel 格式）
+    """
+    columns = sorted(set(columns)) if columns is not None else None
+    start_row = max(int(start_row), 1)
+
+    fmt = detect_format(source)
+    if fmt == 'csv':
+        return _read_csv_columns(source, columns, start_row)
+    if fmt in ('parquet', 'arrow'):
+        return _read_columnar(source, fmt, columns, start_row)
+
+    # xlsx/xlsm 是 zip 包，按内容识别（URL 缓存文件可能没有扩展名）
+    if zipfile.is_zipfile(source):
+        try:
+            return _read_xlsx_columns(source, sheet_name, columns, start_row)
+        except KeyError:
+            # 其他 zip 格式（如 .ods），交给 pandas 识别
+            pass
+    if not isinstance(source, str):
+        source.seek(0)
+    return _read_excel_columns(source, sheet_name, columns, start_row)
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def load_table(path, sheet_name, columns, start_row=1, sidecars=None, build_sidecar=False):
+    """
+    带缓存读取本地工作簿
+    返回 (DataFrame, 是否命中缓存)；文件未修改时直接复用上次的解析结果
+    sidecars（ParquetSidecars）: Excel 工作簿有最新的 Parquet 副本时读取副本，
+    build_sidecar 为 True 且没有副本时先生成副本（命中缓存时同样生成）
+    """
+    key = _file_signature(path) + (sheet_name, tuple(sorted(set(columns))), max(int(start_row), 1))
+    use_sidecar = sidecars is not None and detect_format(path) in ('xlsx', 'xls')
+
+    with _table_cache_lock:
+        df = _table_cache.get(key)
+        if df is not None:
+            _table_cache.move_to_end(key)
+    if df is not None:
+        if use_sidecar and build_sidecar:
+            sidecars.ensure(path, sheet_name)
+        return df, True
+
+    if use_sidecar:
+        df = sidecars.read(path, sheet_name, columns, start_row, build=build_sidecar)
+    if df is None:
+        df = read_table_columns(path, sheet_name, columns, start_row)
+
+    with _table_cache_lock:
+        _table_cache[key] = df
+        # 同一文件的旧版本不再有用
+        for old_key in [k for k in _table_cache if k[0] == key[0] and k[1:3] != key[1:3]]:
+            del _table_cache[old_key]
+        while len(_table_cache) > TABLE_CACHE_MAX_ENTRIES:
+            _table_cache.popitem(last=False)
+    return df, False
+
+
+class ParquetSidecars:
+    """
+    Excel 工作簿的 Parquet 副本（每个工作表一个文件，包含所有列和原始行号）
+    副本记录源文件的 mtime 与大小，源文件修改后自动失效；没有安装 pyarrow 时不可用
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        try:
+            _require_pyarrow()
+            return True
+        except ImportError:
+            return False
+
+    def path_for(self, source, sheet_name):
+        key = f"{os.path.abspath(source)}|{sheet_name}"
+        return os.path.join(self.folder,
+                            hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest() + '.parquet')
+
+    @staticmethod
+    def _version(source):
+        st = os.stat(source)
+        return {b'source_mtime_ns': str(st.st_mtime_ns).encode(), b'source_size': str(st.st_size).encode()}
+
+    def is_fresh(self, source, sheet_name):
+        path = self.path_for(source, sheet_name)
+        if not os.path.exists(path) or not self.available():
+            return False
+        pa = _require_pyarrow()
+        try:
+            metadata = pa.parquet.read_schema(path).metadata or {}
+        except (OSError, pa.ArrowException):
+            return False
+        version = self._version(source)
+        return all(metadata.get(k) == v for k, v in version.items())
+
+    def build(self, source, sheet_name):
+        """读取整张工作表并写入 Parquet 副本，返回副本路径"""
+        pa = _require_pyarrow()
+        version = self._version(source)
+        full = read_table_columns(source, sheet_name, None, 1)
+        arrays = [pa.array(full.index.to_numpy(dtype=np.int64))]
+        names = [ROW_COLUMN]
+        for col in full.columns:
+            arrays.append(_to_arrow(pa, full[col]))
+            names.append(str(col))
+        table = pa.Table.from_arrays(arrays, names=names)
+        table = table.replace_schema_metadata({**version, b'sheet_name': sheet_name.encode('utf-8')})
+
+        path = self.path_for(source, sheet_name)
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with self._lock:
+            pa.parquet.write_table(table, tmp_path)
+            os.replace(tmp_path, path)
+        print(f"📦 已生成 Parquet 副本: {os.path.basename(source)} [{sheet_name}] "
+              f"{len(full)} 行 x {len(full.columns)} 列")
+        return path
+
+    def ensure(self, source, sheet_name):
+        """没有最新副本时生成副本，返回副本是否可用"""
+        if not self.available():
+            print("⚠️ 未安装 pyarrow，无法生成 Parquet 副本")
+            return False
+        if not self.is_fresh(source, sheet_name):
+            self.build(source, sheet_name)
+        return True
+
+    def read(self, source, sheet_name, columns, start_row, build=False):
+        """有最新副本时从副本投影读取（内存映射），否则按需生成；不可用时返回 None"""
+        if build:
+            if not self.ensure(source, sheet_name):
+                return None
+        elif not self.is_fresh(source, sheet_name):
+            return None
+        pa = _require_pyarrow()
+        path = self.path_for(source, sheet_name)
+        available = set(pa.parquet.read_schema(path).names)
+        columns = sorted(set(columns))
+        present = [col for col in columns if str(col) in available]
+        table = pa.parquet.read_table(path, columns=[ROW_COLUMN] + [str(col) for col in present],
+                                      memory_map=True)
+        rows = table.column(ROW_COLUMN).to_numpy()
+        keep = np.flatnonzero(rows >= max(int(start_row), 1) - 1)
+        if len(keep) < len(rows):
+            table = table.take(pa.array(keep))
+            rows = rows[keep]
+        df = _arrow_frame(table, present, [str(col) for col in present], rows)
+        # 与直接读取 Excel 一致：行号从 start_row 开始连续
+        last = rows[-1] + 1 if len(rows) else max(int(start_row), 1) - 1
+        return df.reindex(pd.RangeIndex(max(int(start_row), 1) - 1, last)).astype(object)
+
+
+def _to_arrow(pa, column):
+    """
+    Excel 单元格值列转为 Arrow 列：全为布尔 / 整数 / 小数 / 文本时保留类型，
+    混合类型（如整数与小数、数字与文本）的列转为文本，读回后 str() 结果与直接读取 Excel 一致
+    """
+    cleaned = [None if isinstance(value, float) and np.isnan(value) else value
+               for value in column.tolist()]
+    kinds = {bool if isinstance(value, (bool, np.bool_))
+             else int if isinstance(value, (int, np.integer))
+             else float if isinstance(value, (float, np.floating))
+             else str for value in cleaned if value is not None}
+    arrow_types = {bool: pa.bool_(), int: pa.int64(), float: pa.float64()}
+    if len(kinds) == 1 and next(iter(kinds)) in arrow_types:
+        try:
+            return pa.array(cleaned, type=arrow_types[next(iter(kinds))])
+        except (pa.ArrowInvalid, OverflowError):
+            # 超出 int64 范围的整数
+            pass
+    return pa.array([None if value is None else str(value) for value in cleaned], type=pa.string())